@@ -0,0 +1,180 @@
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+from aiohttp import web
+from rekhta.mockserver import MockSite
+
+# Runs the scraping pipeline end to end against a local mock of rekhta.org
+# and reports pages/sec, CPU time and peak RSS per stage, so throughput can
+# be compared between commits without touching the real site.
+# Usage: python scripts/benchmark.py [--poets 50 --latency 0.05 ...]
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Stage name -> script, in pipeline order; each reads what the previous wrote
+STAGES = {
+    "poets": "scrape_poets.py",
+    "poems_list": "scrape_poems_list_async.py",
+    "ghazals": "scrape_ghazals_optimized.py",
+    "nazms": "scrape_nazms.py",
+    "shers": "scrape_shers_async.py",
+}
+# Alternatives to the stages above, benchmarked only when asked for by name
+EXTRA_STAGES = {
+    "pipeline": "run_pipeline.py",
+    "poems_list_sequential": "scrape_poems_list.py",
+    "shers_sequential": "scrape_shers.py",
+}
+
+
+def start_server(site, port=0):
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(site.make_app(), access_log=None)
+    loop.run_until_complete(runner.setup())
+    server = web.TCPSite(runner, "127.0.0.1", port)
+    loop.run_until_complete(server.start())
+    # With port 0 the OS picks a free port; the runner knows which
+    port = runner.addresses[0][1]
+
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return f"http://127.0.0.1:{port}", stop
+
+
+def run_stage(name, script, work_dir, env):
+    log_path = os.path.join(work_dir, f"{name}.log")
+    with open(log_path, "w") as log:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(SCRIPTS_DIR, script)],
+            cwd=work_dir,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        # wait4 gives this stage's own rusage, including its parse workers
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        elapsed = time.perf_counter() - start
+
+    return {
+        "stage": name,
+        "returncode": process.returncode,
+        "seconds": elapsed,
+        "cpu_seconds": usage.ru_utime + usage.ru_stime,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": usage.ru_maxrss / 1024,
+        "log": log_path,
+    }
+
+
+def benchmark(site, stages, parser=None, work_dir=None):
+    work_dir = work_dir or tempfile.mkdtemp(prefix="rekhta-bench-")
+    os.makedirs(os.path.join(work_dir, "data"), exist_ok=True)
+    base_url, stop = start_server(site)
+
+    env = {
+        key: value for key, value in os.environ.items()
+        if key not in ("REKHTA_CACHE", "REKHTA_CACHE_MODE")
+    }
+    env["REKHTA_BASE_URL"] = base_url
+    env["REKHTA_METRICS_DIR"] = os.path.join(work_dir, "metrics")
+    if parser:
+        env["REKHTA_PARSER"] = parser
+
+    results = []
+    try:
+        for name in stages:
+            script = STAGES.get(name) or EXTRA_STAGES[name]
+            before = site.stats()
+            result = run_stage(name, script, work_dir, env)
+            after = site.stats()
+            for key in before:
+                result[key] = after[key] - before[key]
+            result["pages_per_sec"] = result["requests"] / result["seconds"]
+            results.append(result)
+            print_result(result)
+            if result["returncode"] != 0:
+                print(f"Stage {name} failed, see {result['log']}")
+                break
+    finally:
+        stop()
+    return results, work_dir
+
+
+def print_result(result):
+    print(
+        f"{result['stage']:<24} {result['requests']:>7} pages "
+        f"{result['seconds']:>7.2f}s {result['pages_per_sec']:>8.1f} pages/s "
+        f"cpu {result['cpu_seconds']:>6.2f}s rss {result['peak_rss_mb']:>6.1f}MB "
+        f"errors {result['errors']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the scrapers against a local mock of rekhta.org"
+    )
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        default=list(STAGES),
+        choices=list(STAGES) + list(EXTRA_STAGES),
+    )
+    parser.add_argument("--poets", type=int, default=20)
+    parser.add_argument("--poems", type=int, default=10, help="per poet and form")
+    parser.add_argument("--shers", type=int, default=30, help="per poet")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--filler-kb", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument(
+        "--recorded", help="page cache directory to serve recorded pages from"
+    )
+    parser.add_argument("--parser", choices=["bs4", "lxml"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", help="keep outputs here instead of a tmp dir")
+    parser.add_argument("--out", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    site = MockSite(
+        poets=args.poets,
+        poems=args.poems,
+        shers=args.shers,
+        page_size=args.page_size,
+        filler_kb=args.filler_kb,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        recorded=args.recorded,
+        seed=args.seed,
+    )
+    results, work_dir = benchmark(site, args.stages, args.parser, args.work_dir)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+    if not args.work_dir and all(r["returncode"] == 0 for r in results):
+        shutil.rmtree(work_dir)
+    if any(r["returncode"] != 0 for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
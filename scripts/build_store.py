@@ -0,0 +1,47 @@
+import os
+import argparse
+from rekhta.corpus import CORPUS_FORMS, DUMP_FILES
+from rekhta.alignment import build_alignment
+from rekhta.store import CorpusStore, build_store
+
+# Packs the ghazal, nazm and sher dumps into a memory-mapped store for data
+# loaders (see rekhta.store.CorpusStore):
+#   store = CorpusStore("data/store")
+#   store[42]["text"]
+#   for row in store.iter_rows(lang="ur", form="shers", shard=rank,
+#                              num_shards=world_size): ...
+# It also builds the line alignment across ur/hi/en/en-rm on top of it
+# (see rekhta.alignment.AlignmentIndex):
+#   for ur_line, roman_line in AlignmentIndex("data/store").pairs("ur", "en-rm")
+
+STORE_DIR = "data/store"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the memory-mapped corpus store from the dumps"
+    )
+    parser.add_argument("--out", default=STORE_DIR)
+    parser.add_argument("--forms", nargs="+", default=list(CORPUS_FORMS))
+    args = parser.parse_args()
+
+    dump_files = {}
+    for form in args.forms:
+        if os.path.exists(DUMP_FILES[form]):
+            dump_files[form] = DUMP_FILES[form]
+        else:
+            print(f"Skipping {form}, {DUMP_FILES[form]} does not exist")
+
+    rows = build_store(dump_files, args.out)
+    with CorpusStore(args.out) as store:
+        print(
+            f"Stored {rows} texts from {len(store.poets)} poets "
+            f"({', '.join(store.forms)}) in {args.out}"
+        )
+
+    counts = build_alignment(args.out)
+    print("Alignment units: " + ", ".join(f"{n} {s}" for s, n in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
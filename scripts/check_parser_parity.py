@@ -0,0 +1,80 @@
+import os
+import sys
+import urllib.request
+from rekhta import LANGS, LANG_PAGES
+from rekhta.extract import get_extractor
+from rekhta.mockserver import MockSite
+
+# Run every extractor over saved pages with both backends and report any
+# page where the lxml output is not identical to the BeautifulSoup output.
+# With no arguments the pages come from the mock site (rekhta.mockserver):
+# a poet directory, poem lists, couplet pages and poems in every page
+# language, with translations inside them.
+# Usage: python scripts/check_parser_parity.py [page.html | dir_of_pages ...]
+
+CHECKS = {
+    "poem": lambda extract, html: extract(html, LANGS),
+    "shers": lambda extract, html: extract(html, LANGS),
+    "links": lambda extract, html: extract(html),
+}
+
+
+def iter_paths(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.endswith((".html", ".htm")):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def iter_files(paths):
+    for path in iter_paths(paths):
+        with open(path, "rb") as f:
+            yield path, f.read()
+
+
+def iter_mock_pages(poets=3):
+    # Imported here: benchmark.py is a script, and only this mode needs it
+    from benchmark import start_server
+
+    site = MockSite(poets=poets, poems=3, page_size=2)
+    url, stop = start_server(site)
+    page_langs = sorted(set(LANG_PAGES.values()))
+    paths = ["/poets?startswith=a"]
+    for poet in site.poets:
+        paths += [f"/poets/{poet}/ghazals", f"/poets/{poet}/nazms"]
+        paths += [f"/poets/{poet}/couplets?lang={lang}" for lang in page_langs]
+        for form in ("ghazals", "nazms"):
+            slug = f"{poet}-{form[:-1]}-0"
+            paths += [f"/{form}/{slug}?lang={lang}" for lang in page_langs]
+    try:
+        for path in paths:
+            with urllib.request.urlopen(url + path) as response:
+                yield path, response.read()
+    finally:
+        stop()
+
+
+def check_parity(pages):
+    checked, mismatches = 0, 0
+    for path, html in pages:
+        for kind, check in CHECKS.items():
+            expected = check(get_extractor(kind, "bs4"), html)
+            actual = check(get_extractor(kind, "lxml"), html)
+            checked += 1
+            if expected != actual:
+                mismatches += 1
+                print(f"MISMATCH {kind} {path}")
+                print(f"  bs4:  {expected!r}")
+                print(f"  lxml: {actual!r}")
+
+    print(f"{checked} checks, {mismatches} mismatches")
+    return mismatches == 0
+
+
+if __name__ == "__main__":
+    pages = iter_files(sys.argv[1:]) if sys.argv[1:] else iter_mock_pages()
+    sys.exit(0 if check_parity(pages) else 1)
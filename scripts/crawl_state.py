@@ -0,0 +1,115 @@
+import os
+import argparse
+from rekhta.corpus import DUMP_FILES, JOURNAL_FILES, POEM_FORMS
+from rekhta.journal import read_json, replay_journal, write_json
+from rekhta.state import CrawlState
+from scrape_poets import dump_poets
+
+# The SQLite crawl state (rekhta/state.py) is the store of run_pipeline.py
+# only. The per-stage scrapers (scrape_poets.py, scrape_poems_list_async.py,
+# scrape_ghazals_optimized.py, scrape_nazms.py, scrape_shers*.py) still
+# resume from and write to the JSON dumps and their journals, and the dumps
+# stay the files every other script reads. This moves the crawl between
+# the two:
+#   import  load the existing dumps (and any pending journals) into the state
+#   export  regenerate the JSON dumps from the state, in the same formats
+#   status  row counts, including fetches that are still failing
+# Usage: python scripts/crawl_state.py import|export|status
+# Each dump's size and mtime are recorded on import and export, so callers
+# such as run_pipeline.py can re-import just the dumps another scraper wrote
+# and the two sides do not overwrite each other.
+
+STATE_FILE = "data/rekhta_crawl_state.sqlite"
+POETS_FILE = "data/rekhta_all_poets_list.json"
+POEMS_LIST_FILE = "data/rekhta_all_poets_poems_list.json"
+SHERS_FILE = DUMP_FILES["shers"]
+KINDS = ["poets", "poems_list", *POEM_FORMS, "shers"]
+
+
+def dump_signature(kind):
+    # Changes whenever the dump, or a journal pending on top of it, is written
+    paths = [DUMP_FILES.get(kind), JOURNAL_FILES.get(kind)]
+    if kind == "poets":
+        paths = [POETS_FILE]
+    elif kind == "poems_list":
+        paths = [POEMS_LIST_FILE]
+    elif kind == "shers":
+        paths = [SHERS_FILE]
+    parts = []
+    for path in paths:
+        if path and os.path.exists(path):
+            stat = os.stat(path)
+            parts.append(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(parts)
+
+
+def import_dumps(state, kinds=KINDS, changed_only=False):
+    """Load dumps into the state; with ``changed_only``, only those written
+    since the state last imported or exported them. Returns what was loaded.
+    """
+    imported = []
+    for kind in kinds:
+        signature = dump_signature(kind)
+        if not signature:
+            continue
+        if changed_only and state.get_meta(f"signature:{kind}") == signature:
+            continue
+        if kind == "poets":
+            state.import_poets(read_json(POETS_FILE, []))
+            # scrape_poets.py writes the list once the directory is crawled
+            state.set_meta("poets_discovered", "1")
+        elif kind == "poems_list":
+            state.import_poems_list(read_json(POEMS_LIST_FILE, {}))
+        elif kind == "shers":
+            state.import_shers(read_json(SHERS_FILE, {}))
+        else:
+            dump = read_json(DUMP_FILES[kind], {})
+            replay_journal(JOURNAL_FILES[kind], dump)
+            state.import_poems(kind, dump)
+        state.set_meta(f"signature:{kind}", signature)
+        imported.append(kind)
+    state.flush()
+    return imported
+
+
+def export_dumps(state, kinds=KINDS):
+    for kind in kinds:
+        if kind == "poets":
+            poets = state.export_poets()
+            if poets:
+                dump_poets(poets, POETS_FILE)
+        elif kind == "poems_list":
+            poems_list = state.export_poems_list(POEM_FORMS)
+            if poems_list:
+                write_json(poems_list, POEMS_LIST_FILE)
+        elif kind == "shers":
+            shers = state.export_shers()
+            if shers:
+                write_json(shers, SHERS_FILE)
+        else:
+            dump = state.export_poems(kind)
+            if dump:
+                write_json(dump, DUMP_FILES[kind])
+        # What was just written is what the state holds, no need to re-import
+        state.set_meta(f"signature:{kind}", dump_signature(kind))
+    state.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Import the JSON dumps into the crawl state or export them back"
+    )
+    parser.add_argument("command", choices=["import", "export", "status"])
+    parser.add_argument("--state", default=STATE_FILE)
+    args = parser.parse_args()
+
+    with CrawlState(args.state) as state:
+        if args.command == "import":
+            import_dumps(state)
+        elif args.command == "export":
+            export_dumps(state)
+        print(", ".join(f"{count} {name}" for name, count in state.counts().items()))
+
+
+if __name__ == "__main__":
+    main()
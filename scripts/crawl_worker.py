@@ -0,0 +1,204 @@
+import os
+import glob
+import socket
+import asyncio
+import argparse
+from multiprocessing import Process
+from rekhta import (
+    LANGS,
+    METRICS,
+    ParsePool,
+    RekhtaClient,
+    fetch_poem,
+    report_metrics,
+)
+from rekhta.corpus import DUMP_FILES, JOURNAL_FILES, POEM_FORMS
+from rekhta.frontier import LEASE_SECONDS, Frontier
+from rekhta.journal import append_journal, compact_poems, read_json, replay_journal
+from rekhta.seen import iter_items
+
+# Spreads ghazal/nazm fetching over several processes, on one host or on
+# several hosts sharing the data directory, through a leased frontier (see
+# rekhta/frontier.py). Each worker claims a batch of poem URLs, fetches
+# them, and writes the texts to its own journal in data/frontier/, so
+# workers never contend on an output file.
+#   seed    queue every listed poem with the languages the dumps lack,
+#           requeueing failed or done ones that still lack some
+#   work    run workers until the frontier is drained (--processes N)
+#   merge   fold the worker journals into the dumps, once workers are done
+#   status  how many poems are pending, leased, done and failed
+# Usage: python scripts/crawl_worker.py seed
+#        python scripts/crawl_worker.py work --processes 4
+#        python scripts/crawl_worker.py merge
+# Workers on other hosts only need `work`, with --shared-fs.
+
+FRONTIER_FILE = "data/rekhta_frontier.sqlite"
+FRONTIER_DIR = "data/frontier"
+POEMS_LIST_FILE = "data/rekhta_all_poets_poems_list.json"
+BATCH_SIZE = 50
+# How often to look for expired leases while others hold the rest
+IDLE_POLL_SECONDS = 5
+
+
+def worker_journals(form):
+    return sorted(glob.glob(os.path.join(FRONTIER_DIR, f"{form}.*.journal.jsonl")))
+
+
+def load_with_journals(form):
+    # The dump as it stands with every pending journal, scrapers' and workers'
+    dump = read_json(DUMP_FILES[form], {})
+    for journal_file in [JOURNAL_FILES[form]] + worker_journals(form):
+        replay_journal(journal_file, dump)
+    return dump
+
+
+def seed(frontier):
+    poems_list = read_json(POEMS_LIST_FILE, {})
+    for form in POEM_FORMS:
+        dump = load_with_journals(form)
+        items = []
+        for poet, details in poems_list.items():
+            poet_poems = dump.get(poet, {})
+            for url in details.get(form, []):
+                poem_langs = poet_poems.get(url, {})
+                missing = [lang for lang in LANGS if poem_langs.get(lang) is None]
+                if missing:
+                    items.append((url, poet, form, missing))
+        queued = frontier.add(items)
+        print(f"Queued {queued} of {len(items)} unfinished {form}")
+
+
+async def renew_leases(frontier, owner, urls, lease_seconds):
+    while True:
+        await asyncio.sleep(lease_seconds / 3)
+        held = await asyncio.to_thread(frontier.renew, owner, urls, lease_seconds)
+        if held < len(urls):
+            print(f"{owner} lost {len(urls) - held} leases, they were reclaimed")
+
+
+async def work(owner, frontier, journals, batch_size, lease_seconds, parse_workers):
+    with ParsePool(parse_workers) as parser:
+        async with RekhtaClient() as client:
+            while True:
+                items, reclaimed = await asyncio.to_thread(
+                    frontier.claim, owner, batch_size, lease_seconds
+                )
+                if reclaimed:
+                    METRICS.inc("frontier_reclaimed", reclaimed)
+                if not items:
+                    wait = await asyncio.to_thread(frontier.next_expiry)
+                    if wait is None:
+                        break
+                    # Others are still working; pick up whatever they drop
+                    await asyncio.sleep(min(wait, IDLE_POLL_SECONDS) + 0.1)
+                    continue
+                METRICS.inc("frontier_claimed", len(items))
+
+                urls = [url for url, *_ in items]
+                renewer = asyncio.create_task(
+                    renew_leases(frontier, owner, urls, lease_seconds)
+                )
+                try:
+                    results = await asyncio.gather(
+                        *[
+                            fetch_poem(client, parser, url, langs)
+                            for url, _, _, langs in items
+                        ]
+                    )
+                finally:
+                    renewer.cancel()
+
+                done, remaining = [], {}
+                for (url, poet, form, langs), texts in zip(items, results):
+                    for lang, text in texts.items():
+                        append_journal(journals[form], poet, url, lang, text)
+                    missing = [lang for lang in langs if lang not in texts]
+                    if missing:
+                        remaining[url] = missing
+                    else:
+                        done.append(url)
+                await asyncio.to_thread(frontier.complete, owner, done)
+                await asyncio.to_thread(frontier.release, owner, remaining)
+                METRICS.inc("frontier_done", len(done))
+                METRICS.inc("frontier_released", len(remaining))
+
+
+async def run_worker(frontier_file, wal, batch_size, lease_seconds, parse_workers):
+    owner = f"{socket.gethostname()}-{os.getpid()}"
+    os.makedirs(FRONTIER_DIR, exist_ok=True)
+    journals = {
+        form: open(
+            os.path.join(FRONTIER_DIR, f"{form}.{owner}.journal.jsonl"),
+            "a",
+            encoding="utf-8",
+        )
+        for form in POEM_FORMS
+    }
+    try:
+        with Frontier(frontier_file, wal) as frontier:
+            async with report_metrics(f"worker-{owner}"):
+                await work(
+                    owner, frontier, journals, batch_size, lease_seconds, parse_workers
+                )
+    finally:
+        for journal in journals.values():
+            journal.close()
+
+
+def worker_process(*args):
+    asyncio.run(run_worker(*args))
+
+
+def merge():
+    # Streamed one journal at a time. The scrapers' own journal is theirs to
+    # compact: one of them may still be appending to it.
+    for form in POEM_FORMS:
+        dump_file = DUMP_FILES[form]
+        journal_files = worker_journals(form)
+        for journal_file in journal_files:
+            # Workers finish poems in any order, the dump follows the list
+            order = ((poet, d[form]) for poet, d in iter_items(POEMS_LIST_FILE))
+            compact_poems(dump_file, journal_file, order)
+        if journal_files:
+            print(f"Merged {len(journal_files)} worker journals into {dump_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Crawl ghazals and nazms with several workers sharing a frontier"
+    )
+    parser.add_argument("command", choices=["seed", "work", "merge", "status"])
+    parser.add_argument("--frontier", default=FRONTIER_FILE)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS)
+    parser.add_argument(
+        "--shared-fs",
+        action="store_true",
+        help="workers on several hosts: use a rollback journal instead of WAL",
+    )
+    args = parser.parse_args()
+    wal = not args.shared_fs
+
+    if args.command == "work":
+        parse_workers = max(1, (os.cpu_count() or 1) // args.processes)
+        worker_args = (args.frontier, wal, args.batch_size, args.lease, parse_workers)
+        processes = [
+            Process(target=worker_process, args=worker_args)
+            for _ in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    elif args.command == "merge":
+        merge()
+
+    with Frontier(args.frontier, wal) as frontier:
+        if args.command == "seed":
+            seed(frontier)
+        print(", ".join(f"{n} {status}" for status, n in frontier.counts().items()))
+
+
+if __name__ == "__main__":
+    main()
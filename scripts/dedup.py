@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import argparse
+from rekhta.corpus import DUMP_FILES, iter_couplets, iter_rows, load_dump
+from rekhta.dedup import BANDS, THRESHOLD, compute_signatures, find_clusters
+from rekhta.journal import write_json
+
+# Near-duplicate detection over the scraped dumps, at two levels:
+#   poem     whole ghazals/nazms, e.g. the same poem listed under two slugs
+#   couplet  every sher, including each couplet of every ghazal and nazm,
+#            e.g. a popular sher on a poet's couplets page and in a ghazal
+# Texts of one language (--lang) are compared. Clusters go to
+# data/dedup/clusters.jsonl, with the kept member first, and deduplicated
+# dumps to data/dedup/. Only whole units are dropped: duplicate poems from
+# the ghazal/nazm dumps and duplicate shers from the sher dump; couplets
+# repeated inside poems are reported but left in place.
+
+OUT_DIR = "data/dedup"
+LANG = "ur"
+WORKERS = os.cpu_count()
+# When texts are duplicates, keep the one from the earliest form listed here
+FORM_PRIORITY = ["ghazals", "nazms", "shers"]
+
+
+def collect_units(dumps, lang):
+    poems, couplets = [], []
+    for form, dump in dumps.items():
+        if form != "shers":
+            for row in iter_rows(form, dump):
+                if row["lang"] == lang:
+                    poems.append(row)
+        for row in iter_couplets(form, dump):
+            if row["lang"] == lang:
+                couplets.append(row)
+    return poems, couplets
+
+
+def unit_ref(row):
+    return {key: row[key] for key in ("form", "poet", "url", "sher")}
+
+
+def cluster_units(units, workers, threshold):
+    signatures = compute_signatures([unit["text"] for unit in units], workers)
+    clusters = []
+    for members in find_clusters(signatures, BANDS, threshold):
+        # Keep the highest-priority form, then whatever came first
+        members.sort(key=lambda i: (FORM_PRIORITY.index(units[i]["form"]), i))
+        clusters.append([units[i] for i in members])
+    return clusters
+
+
+def dedup_dumps(dumps, poem_clusters, couplet_clusters):
+    drop_poems = {
+        (unit["form"], unit["url"]) for cluster in poem_clusters for unit in cluster[1:]
+    }
+    drop_shers = {
+        (unit["poet"], unit["sher"])
+        for cluster in couplet_clusters
+        for unit in cluster[1:]
+        if unit["form"] == "shers"
+    }
+
+    deduped = {}
+    for form, dump in dumps.items():
+        if form == "shers":
+            deduped[form] = {
+                poet: [
+                    sher for i, sher in enumerate(shers) if (poet, i) not in drop_shers
+                ]
+                for poet, shers in dump.items()
+            }
+        else:
+            deduped[form] = {
+                poet: {
+                    url: langs
+                    for url, langs in poems.items()
+                    if (form, url) not in drop_poems
+                }
+                for poet, poems in dump.items()
+            }
+    return deduped, len(drop_poems), len(drop_shers)
+
+
+def dedup(dump_files, out_dir, lang=LANG, workers=WORKERS, threshold=THRESHOLD):
+    dumps = {}
+    for form, dump_file in dump_files.items():
+        if os.path.exists(dump_file):
+            dumps[form] = load_dump(dump_file)
+        else:
+            print(f"Skipping {form}, {dump_file} does not exist")
+
+    start = time.perf_counter()
+    poems, couplets = collect_units(dumps, lang)
+    poem_clusters = cluster_units(poems, workers, threshold) if poems else []
+    couplet_clusters = cluster_units(couplets, workers, threshold)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{len(poem_clusters)} poem and {len(couplet_clusters)} couplet clusters "
+        f"among {len(poems)} poems and {len(couplets)} couplets in {elapsed:.1f}s"
+    )
+
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "clusters.jsonl"), "w", encoding="utf-8") as f:
+        for level, clusters in (("poem", poem_clusters), ("couplet", couplet_clusters)):
+            for cluster in clusters:
+                record = {
+                    "level": level,
+                    "lang": lang,
+                    "members": [unit_ref(unit) for unit in cluster],
+                    "text": cluster[0]["text"],
+                }
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    deduped, dropped_poems, dropped_shers = dedup_dumps(
+        dumps, poem_clusters, couplet_clusters
+    )
+    for form, dump in deduped.items():
+        write_json(dump, os.path.join(out_dir, os.path.basename(dump_files[form])))
+    print(f"Dropped {dropped_poems} duplicate poems and {dropped_shers} shers")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find near-duplicate poems and shers and write deduped dumps"
+    )
+    parser.add_argument("--out", default=OUT_DIR)
+    parser.add_argument("--lang", default=LANG)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    dedup(DUMP_FILES, args.out, args.lang, args.workers, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import os
+import shutil
+import argparse
+from tqdm import tqdm
+from rekhta.corpus import CORPUS_FORMS, DUMP_FILES, iter_rows, load_dump
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Writes the ghazal, nazm and sher dumps as a Parquet dataset partitioned by
+# form (data/parquet/form=ghazals/part-00000.parquet, ...), one row per text
+# and language. Rows stay grouped by poet, so row group statistics let
+# readers skip straight to one poet:
+#   pq.read_table("data/parquet", columns=["url", "text"],
+#                 filters=[("poet", "=", poet_url), ("lang", "=", "ur")])
+# Needs pyarrow, which the scrapers themselves do not.
+
+OUT_DIR = "data/parquet"
+ROW_GROUP_SIZE = 16384
+ROWS_PER_FILE = 262144
+# Low-cardinality columns are dictionary encoded, in Arrow and on disk
+DICTIONARY_COLUMNS = ["poet", "form", "lang"]
+
+
+def make_schema():
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema(
+        [
+            ("poet", dictionary),
+            ("form", dictionary),
+            ("url", pa.string()),
+            ("sher", pa.int32()),
+            ("lang", dictionary),
+            ("text", pa.string()),
+        ]
+    )
+
+
+class PartWriter:
+    """Writes rows to numbered part files, ROWS_PER_FILE rows per file."""
+
+    def __init__(self, part_dir, schema):
+        self.part_dir = part_dir
+        self.schema = schema
+        self.columns = {name: [] for name in schema.names}
+        self.writer = None
+        self.parts = 0
+        self.file_rows = 0
+        self.rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, row):
+        for name, values in self.columns.items():
+            values.append(row[name])
+        if len(self.columns["text"]) >= ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        count = len(self.columns["text"])
+        if not count:
+            return
+        if self.writer is None:
+            path = os.path.join(self.part_dir, f"part-{self.parts:05d}.parquet")
+            self.writer = pq.ParquetWriter(
+                path,
+                self.schema,
+                compression="zstd",
+                use_dictionary=DICTIONARY_COLUMNS,
+            )
+            self.parts += 1
+        table = pa.Table.from_pydict(self.columns, schema=self.schema)
+        self.writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+        for values in self.columns.values():
+            values.clear()
+        self.rows += count
+        self.file_rows += count
+        if self.file_rows >= ROWS_PER_FILE:
+            self.writer.close()
+            self.writer = None
+            self.file_rows = 0
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def export_form(form, dump_file, out_dir):
+    part_dir = os.path.join(out_dir, f"form={form}")
+    tmp_dir = part_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    dump = load_dump(dump_file)
+    with PartWriter(tmp_dir, make_schema()) as writer:
+        for row in tqdm(iter_rows(form, dump), desc=form, unit=" rows"):
+            writer.write(row)
+
+    # Swap the whole partition in at once so readers never see a mix
+    shutil.rmtree(part_dir, ignore_errors=True)
+    os.replace(tmp_dir, part_dir)
+    return writer.rows, writer.parts
+
+
+def export_parquet(dump_files, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    for form, dump_file in dump_files.items():
+        if not os.path.exists(dump_file):
+            print(f"Skipping {form}, {dump_file} does not exist")
+            continue
+        rows, parts = export_form(form, dump_file, out_dir)
+        print(f"Wrote {rows} {form} rows to {parts} file(s) under {out_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export the scraped dumps as a partitioned Parquet dataset"
+    )
+    parser.add_argument("--out", default=OUT_DIR)
+    parser.add_argument("--forms", nargs="+", default=list(CORPUS_FORMS))
+    args = parser.parse_args()
+
+    if pa is None:
+        raise SystemExit("Parquet export needs pyarrow: pip install pyarrow")
+
+    dump_files = {form: DUMP_FILES[form] for form in args.forms}
+    export_parquet(dump_files, args.out)
+
+
+if __name__ == "__main__":
+    main()
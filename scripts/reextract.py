@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import argparse
+from multiprocessing import Pool
+from tqdm import tqdm
+from rekhta import LANGS, PageCache
+from rekhta.journal import write_json
+from rekhta.reextract import collect_shers, extract_cached_page, iter_jobs
+
+CACHE_DIR = os.environ.get("REKHTA_CACHE", "data/cache")
+POEMS_LIST_FILE = "data/rekhta_all_poets_poems_list.json"
+# Written next to, not over, the live dumps: the cache may hold only part
+# of the corpus. Compare, then move them into data/ by hand.
+OUT_DIR = "data/reextracted"
+OUT_FILES = {
+    "ghazals": "rekhta_all_poets_ghazals.json",
+    "nazms": "rekhta_all_poets_nazms.json",
+    "shers": "rekhta_all_poets_shers.json",
+}
+
+
+def load_poem_poets(poems_list_file):
+    poem_poets = {}
+    if os.path.exists(poems_list_file):
+        with open(poems_list_file) as f:
+            poems_list = json.load(f)
+        for poet, details in poems_list.items():
+            for form in ("ghazals", "nazms"):
+                for url in details.get(form, []):
+                    poem_poets[url] = poet
+    return poem_poets
+
+
+def reextract(cache_dir, poems_list_file, out_dir, workers=None, backend=None):
+    cache = PageCache(cache_dir, "offline")
+    poem_poets = load_poem_poets(poems_list_file)
+
+    poems = {"ghazals": {}, "nazms": {}}
+    sher_pages = {}
+    pages, page_bytes = 0, 0
+
+    start = time.perf_counter()
+    with Pool(workers) as pool:
+        results = pool.imap_unordered(
+            extract_cached_page, iter_jobs(cache, backend), chunksize=32
+        )
+        for form, key, page, extracted, size in tqdm(results, unit="page"):
+            pages += 1
+            page_bytes += size
+            if form == "shers":
+                sher_pages.setdefault(key, {}).setdefault(page, {}).update(extracted)
+                continue
+
+            poems[form].setdefault(key, {}).update(extracted)
+    elapsed = time.perf_counter() - start
+
+    # Pages complete in any order, rebuild the dumps in poems list order
+    dumps = {"ghazals": {}, "nazms": {}, "shers": {}}
+    for url, poet in poem_poets.items():
+        for form in ("ghazals", "nazms"):
+            if url in poems[form]:
+                langs = poems[form][url]
+                dumps[form].setdefault(poet, {})[url] = {
+                    lang: langs[lang] for lang in LANGS if lang in langs
+                }
+
+    # The dumps are keyed by poet, which only the poems list knows
+    for form in ("ghazals", "nazms"):
+        unlisted = [url for url in poems[form] if url not in poem_poets]
+        if unlisted:
+            print(
+                f"Left out {len(unlisted)} cached {form} missing from "
+                f"{poems_list_file}, e.g. {unlisted[0]}"
+            )
+
+    for poet, poet_pages in sorted(sher_pages.items()):
+        shers, counts = collect_shers(poet_pages)
+        if shers is None:
+            print(f"Skipping {poet}: incomplete sher pages")
+            continue
+        if counts is not None:
+            print(f"Sher counts differ for {poet}: {counts}")
+        dumps["shers"][poet] = shers
+
+    os.makedirs(out_dir, exist_ok=True)
+    for form, name in OUT_FILES.items():
+        if dumps[form]:
+            write_json(dumps[form], os.path.join(out_dir, name))
+
+    rate = pages / elapsed if elapsed else 0.0
+    print(
+        f"Re-extracted {pages} pages ({page_bytes / 1e6:.1f} MB) in {elapsed:.1f}s: "
+        f"{rate:.1f} pages/sec"
+    )
+    return dumps
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild the ghazal, nazm and sher dumps from cached pages"
+    )
+    parser.add_argument("--cache", default=CACHE_DIR)
+    parser.add_argument("--poems-list", default=POEMS_LIST_FILE)
+    parser.add_argument(
+        "--out", default=OUT_DIR, help="directory to write the rebuilt dumps to"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--parser", choices=["bs4", "lxml"], default=None)
+    args = parser.parse_args()
+
+    reextract(args.cache, args.poems_list, args.out, args.workers, args.parser)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+from tqdm import tqdm
+from rekhta import (
+    LANGS,
+    PageCache,
+    ParsePool,
+    RekhtaClient,
+    plan_fetches,
+    report_metrics,
+    run_workers,
+)
+from rekhta.corpus import DUMP_FILES, JOURNAL_FILES, POEM_FORMS
+from rekhta.journal import (
+    append_journal,
+    compact_journal,
+    read_json,
+    replay_journal,
+)
+
+# Delta crawl: diff a freshly scraped poems list (scrape_poems_list_async.py
+# --all) against the stored ghazal/nazm dumps, fetch only the added poems and
+# re-check the known ones with conditional GETs through the page cache, so
+# unchanged pages cost a 304 instead of a full download. Poems no longer
+# on their poet's list are logged as removed once and dropped from the
+# dumps; poets missing from the poems list, or whose list came back empty,
+# keep theirs.
+
+POEMS_LIST_FILE = "data/rekhta_all_poets_poems_list.json"
+CACHE_DIR = os.environ.get("REKHTA_CACHE", "data/cache")
+CHANGELOG_FILE = "data/changelog.jsonl"
+NUM_WORKERS = 100
+# Optional hard requests/sec ceiling across all workers; below it the
+# client's adaptive limiter finds the rate the server tolerates
+RATE_LIMIT = None
+PARSE_WORKERS = os.cpu_count()
+
+
+def diff_poems(poems_list, dump, form):
+    """Split the listed poems into added and existing, and find the removed.
+
+    Only poets whose list for ``form`` is in ``poems_list`` can have poems
+    removed. A list that came back empty for a poet the dump has poems for
+    is more likely a failed fetch than a purge, so those poems are returned
+    as ``suspect`` and kept.
+    """
+    added, existing, removed, suspect = [], [], [], []
+    listed = set()
+    for poet, details in poems_list.items():
+        known = dump.get(poet, {})
+        for url in details.get(form, []):
+            listed.add(url)
+            if url in known:
+                existing.append((poet, url))
+            else:
+                added.append((poet, url))
+
+    for poet, poems in dump.items():
+        if form not in poems_list.get(poet, {}):
+            continue
+        unlisted = [(poet, url) for url in poems if url not in listed]
+        if not poems_list[poet][form]:
+            suspect.extend(unlisted)
+        else:
+            removed.extend(unlisted)
+    return added, existing, removed, suspect
+
+
+def plan_items(poems):
+    return [
+        (poet, url, page_lang, variants)
+        for poet, url in poems
+        for page_lang, variants in plan_fetches(LANGS).items()
+    ]
+
+
+def log_change(changelog, now, form, poet, url, change, langs):
+    record = {
+        "time": now,
+        "form": form,
+        "poet": poet,
+        "url": url,
+        "change": change,
+        "langs": [lang for lang in LANGS if lang in langs],
+    }
+    changelog.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def load_with_journal(dump_file, journal_file):
+    dump = read_json(dump_file, {})
+    replay_journal(journal_file, dump)
+    return dump
+
+
+async def refresh_form(
+    client, parser, form, poems_list, dump_file, journal_file, recheck, changelog
+):
+    dump = load_with_journal(dump_file, journal_file)
+
+    added, existing, removed, suspect = diff_poems(poems_list, dump, form)
+    print(
+        f"{form}: {len(added)} added, {len(existing)} known, {len(removed)} "
+        f"no longer listed"
+    )
+    if suspect:
+        poets = sorted({poet for poet, _ in suspect})
+        print(
+            f"Warning: {form} lists of {len(poets)} poets came back empty, "
+            f"keeping their {len(suspect)} poems (e.g. {poets[0]})"
+        )
+    # Dropped here, so the dump written at the end no longer has them and
+    # the next run does not report them again
+    for poet, url in removed:
+        del dump[poet][url]
+        if not dump[poet]:
+            del dump[poet]
+
+    to_fetch = added + (existing if recheck else [])
+    added_urls = {url for _, url in added}
+    changes = {}
+
+    async def handle(item):
+        poet, url, page_lang, variants = item
+        html = await client.fetch(url, params={"lang": page_lang}, raw=True)
+        if html is None:
+            return
+
+        fetched = await parser.extract("poem", html, variants, lang=page_lang)
+        if not fetched:
+            return
+        poem_langs = dump.setdefault(poet, {}).setdefault(url, {})
+        for lang, text in fetched.items():
+            if poem_langs.get(lang) == text:
+                continue
+            poem_langs[lang] = text
+            append_journal(journal, poet, url, lang, text)
+            changes.setdefault((poet, url), set()).add(lang)
+
+    items = plan_items(to_fetch)
+    try:
+        with open(journal_file, "a", encoding="utf-8") as journal:
+            with tqdm(total=len(items), desc=form) as progress:
+                await run_workers(items, handle, NUM_WORKERS, progress)
+    finally:
+        compact_journal(dump, dump_file, journal_file)
+
+    now = time.time()
+    for (poet, url), langs in changes.items():
+        change = "added" if url in added_urls else "changed"
+        log_change(changelog, now, form, poet, url, change, langs)
+    for poet, url in removed:
+        log_change(changelog, now, form, poet, url, "removed", [])
+
+    print(f"{form}: {len(changes)} poems added or changed")
+    return changes
+
+
+async def refresh(poems_list_file, cache_dir, recheck=True):
+    with open(poems_list_file, encoding="utf-8") as f:
+        poems_list = json.load(f)
+
+    cache = PageCache(cache_dir, "revalidate")
+    with ParsePool(PARSE_WORKERS) as parser:
+        async with RekhtaClient(rate_limit=RATE_LIMIT, cache=cache) as client:
+            with open(CHANGELOG_FILE, "a", encoding="utf-8") as changelog:
+                for form in POEM_FORMS:
+                    await refresh_form(
+                        client,
+                        parser,
+                        form,
+                        poems_list,
+                        DUMP_FILES[form],
+                        JOURNAL_FILES[form],
+                        recheck,
+                        changelog,
+                    )
+
+
+async def run(poems_list_file, cache_dir, recheck):
+    async with report_metrics("refresh"):
+        await refresh(poems_list_file, cache_dir, recheck)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fetch only new or changed ghazals and nazms"
+    )
+    parser.add_argument("--poems-list", default=POEMS_LIST_FILE)
+    parser.add_argument("--cache", default=CACHE_DIR)
+    parser.add_argument(
+        "--no-recheck",
+        action="store_true",
+        help="only fetch newly listed poems, skip revalidating known ones",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(run(args.poems_list, args.cache, recheck=not args.no_recheck))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+from .cache import PageCache
+from .client import BASE_URL, RekhtaClient
+from .extract import (
+    LANGS,
+    LANG_PAGES,
+    plan_fetches,
+    scrape_lines,
+    extract_poem,
+    extract_shers,
+    extract_links,
+    extract_poets,
+    extract_page_count,
+)
+from .metrics import METRICS, report_metrics
+from .pagination import fetch_pages, fetch_poem
+from .parsing import ParsePool
+from .ratecontrol import AdaptiveLimiter
+from .scheduler import run_workers, start_workers, stop_workers
+from .urls import canonical_url
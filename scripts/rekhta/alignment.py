@@ -0,0 +1,195 @@
+import os
+import json
+import mmap
+import struct
+from itertools import zip_longest
+
+from .store import NO_URL, CorpusStore, map_file
+
+# Line-level alignment of every ghazal, nazm and sher across its languages,
+# built on top of a corpus store (rekhta.store). A unit is one poem or one
+# sher; when every language has the same number of non-blank lines, line i
+# of each language is stored as an (offset, length) slice of the store's
+# texts.bin, so reading a parallel line is a single lookup. Units where a
+# language is missing or the line counts differ are kept but flagged.
+#   alignment_units.bin  one UNIT record per unit
+#   alignment_lines.bin  one LINE record per aligned line, units back to back
+#   alignment.json       language order and per-status unit counts
+
+ALIGN_LANGS = ["ur", "hi", "en", "en-rm"]
+# Key order of the per-sher dicts in the sher dump
+SHER_LANGS = ["hi", "en", "en-rm", "ur"]
+
+ALIGNED, LINE_MISMATCH, MISSING_LANG = 0, 1, 2
+STATUSES = {
+    ALIGNED: "aligned",
+    LINE_MISMATCH: "line_mismatch",
+    MISSING_LANG: "missing_lang",
+}
+
+UNIT = struct.Struct("<QIB3x4i")
+LINE = struct.Struct("<" + "QI" * len(ALIGN_LANGS))
+UNITS_FILE = "alignment_units.bin"
+LINES_FILE = "alignment_lines.bin"
+META_FILE = "alignment.json"
+WHITESPACE = b" \t\r"
+
+
+def zip_shers(poet_shers):
+    """Zip per-language sher lists into the sher dump's per-sher dicts.
+
+    Lists of different lengths are padded with None rather than rejected;
+    the per-language counts are returned alongside so the caller can flag
+    the poet (None when the counts agree).
+    """
+    counts = {lang: len(poet_shers.get(lang, [])) for lang in SHER_LANGS}
+    lists = [poet_shers.get(lang, []) for lang in SHER_LANGS]
+    shers = [dict(zip(SHER_LANGS, sher)) for sher in zip_longest(*lists)]
+    if len(set(counts.values())) == 1:
+        counts = None
+    return shers, counts
+
+
+def flag_mismatch(mismatch_file, poet, counts):
+    print(f"Sher counts differ for {poet}: {counts}")
+    with open(mismatch_file, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"poet": poet, "counts": counts}) + "\n")
+
+
+def line_slices(texts, offset, length):
+    """(offset, length) of every non-blank line of a text in the blob."""
+    slices = []
+    data = texts[offset : offset + length]
+    start = 0
+    for line in data.split(b"\n"):
+        stripped = line.strip(WHITESPACE)
+        if stripped:
+            lead = len(line) - len(line.lstrip(WHITESPACE))
+            slices.append((offset + start + lead, len(stripped)))
+        start += len(line) + 1
+    return slices
+
+
+def iter_units(store):
+    # Rows of one poem or sher are consecutive in the store
+    unit_key, unit_rows = None, {}
+    for row_id, record in enumerate(store.iter_records()):
+        _, _, poet, sher, url, form, lang = record
+        key = (form, url, poet if url == NO_URL else None, sher)
+        if key != unit_key and unit_rows:
+            yield unit_key, unit_rows
+            unit_rows = {}
+        unit_key = key
+        unit_rows[store.langs[lang]] = row_id
+    if unit_rows:
+        yield unit_key, unit_rows
+
+
+def build_alignment(store_dir):
+    """Write the alignment files for the corpus store in ``store_dir``."""
+    counts = {name: 0 for name in STATUSES.values()}
+    tmp_paths = {
+        name: os.path.join(store_dir, name + ".tmp")
+        for name in (UNITS_FILE, LINES_FILE, META_FILE)
+    }
+
+    with CorpusStore(store_dir) as store, open(
+        tmp_paths[UNITS_FILE], "wb"
+    ) as units, open(tmp_paths[LINES_FILE], "wb") as lines:
+        first_line = 0
+        for _, unit_rows in iter_units(store):
+            rows = [unit_rows.get(lang, -1) for lang in ALIGN_LANGS]
+            line_count, status = 0, MISSING_LANG
+            if -1 not in rows:
+                slices = [
+                    line_slices(store.texts, *store.record(row)[:2]) for row in rows
+                ]
+                if len({len(lang_slices) for lang_slices in slices}) == 1:
+                    status = ALIGNED
+                    line_count = len(slices[0])
+                    for line in zip(*slices):
+                        values = [value for pair in line for value in pair]
+                        lines.write(LINE.pack(*values))
+                else:
+                    status = LINE_MISMATCH
+
+            units.write(UNIT.pack(first_line, line_count, status, *rows))
+            first_line += line_count
+            counts[STATUSES[status]] += 1
+
+    with open(tmp_paths[META_FILE], "w", encoding="utf-8") as f:
+        json.dump({"langs": ALIGN_LANGS, "units": counts}, f, indent=2)
+    for name, tmp_path in tmp_paths.items():
+        os.replace(tmp_path, os.path.join(store_dir, name))
+    return counts
+
+
+class AlignmentIndex:
+    """Reads the alignment files next to a corpus store.
+
+    ``pairs("ur", "en-rm")`` yields aligned line pairs straight from the
+    mapped text blob, e.g. for transliteration training; ``unit(i)`` and
+    ``flagged()`` expose every unit with its status.
+    """
+
+    def __init__(self, store_dir):
+        self.store = CorpusStore(store_dir)
+        self.units = map_file(os.path.join(store_dir, UNITS_FILE))
+        self.lines = map_file(os.path.join(store_dir, LINES_FILE))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for mapped in (self.units, self.lines):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        self.store.close()
+
+    def __len__(self):
+        return len(self.units) // UNIT.size
+
+    def line(self, line_id, lang):
+        values = LINE.unpack_from(self.lines, line_id * LINE.size)
+        i = ALIGN_LANGS.index(lang) * 2
+        offset, length = values[i], values[i + 1]
+        return self.store.texts[offset : offset + length].decode("utf-8")
+
+    def unit(self, unit_id):
+        first_line, line_count, status, *rows = UNIT.unpack_from(
+            self.units, unit_id * UNIT.size
+        )
+        some_row = self.store[next(row for row in rows if row != -1)]
+        lines = None
+        if status == ALIGNED:
+            lines = [
+                {lang: self.line(line_id, lang) for lang in ALIGN_LANGS}
+                for line_id in range(first_line, first_line + line_count)
+            ]
+        return {
+            "id": unit_id,
+            "form": some_row["form"],
+            "poet": some_row["poet"],
+            "url": some_row["url"],
+            "sher": some_row["sher"],
+            "status": STATUSES[status],
+            "rows": dict(zip(ALIGN_LANGS, rows)),
+            "lines": lines,
+        }
+
+    def pairs(self, source, target):
+        i, j = ALIGN_LANGS.index(source) * 2, ALIGN_LANGS.index(target) * 2
+        texts = self.store.texts
+        for values in LINE.iter_unpack(self.lines):
+            yield (
+                texts[values[i] : values[i] + values[i + 1]].decode("utf-8"),
+                texts[values[j] : values[j] + values[j + 1]].decode("utf-8"),
+            )
+
+    def flagged(self):
+        for unit_id, record in enumerate(UNIT.iter_unpack(self.units)):
+            if record[2] != ALIGNED:
+                yield self.unit(unit_id)
@@ -0,0 +1,104 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+from urllib.parse import urlencode
+
+CACHE_MODES = ("use", "offline", "revalidate")
+
+
+def cache_key(url, params=None):
+    query = urlencode(sorted((params or {}).items()))
+    return hashlib.sha256(f"{url}?{query}".encode("utf-8")).hexdigest()
+
+
+class PageCache:
+    """On-disk store of fetched pages.
+
+    Page bodies are gzipped and stored by the sha256 of their content under
+    ``blobs/``, so identical pages are kept once. ``index/`` maps the hash
+    of url+params to a small JSON entry with the blob hash and the
+    ETag/Last-Modified validators of the response.
+
+    Modes:
+      use         serve cached pages, fetch and store anything missing
+      offline     serve cached pages only, never touch the network
+      revalidate  send conditional GETs for cached pages, keep them on 304
+    """
+
+    def __init__(self, cache_dir, mode="use"):
+        if mode not in CACHE_MODES:
+            raise ValueError(
+                f"Unknown cache mode {mode!r}, pick one of {CACHE_MODES}"
+            )
+        self.cache_dir = cache_dir
+        self.mode = mode
+
+    @classmethod
+    def from_env(cls):
+        cache_dir = os.environ.get("REKHTA_CACHE")
+        if not cache_dir:
+            return None
+        return cls(cache_dir, os.environ.get("REKHTA_CACHE_MODE", "use"))
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, "index", key[:2], f"{key}.json")
+
+    def blob_path(self, digest):
+        return os.path.join(self.cache_dir, "blobs", digest[:2], f"{digest}.html.gz")
+
+    def get(self, url, params=None):
+        path = self.entry_path(cache_key(url, params))
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def read(self, entry):
+        with gzip.open(self.blob_path(entry["blob"]), "rb") as f:
+            return f.read()
+
+    def put(self, url, params, body, encoding="utf-8", etag=None, last_modified=None):
+        digest = hashlib.sha256(body).hexdigest()
+        blob_path = self.blob_path(digest)
+        if not os.path.exists(blob_path):
+            write_atomic(blob_path, gzip.compress(body))
+
+        entry = {
+            "url": url,
+            "params": params or {},
+            "blob": digest,
+            "encoding": encoding,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        }
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        write_atomic(self.entry_path(cache_key(url, params)), data)
+        return entry
+
+    def touch(self, url, params, entry):
+        entry = dict(entry, fetched_at=time.time())
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        write_atomic(self.entry_path(cache_key(url, params)), data)
+        return entry
+
+    def entries(self):
+        index_dir = os.path.join(self.cache_dir, "index")
+        if not os.path.isdir(index_dir):
+            return
+        for shard in sorted(os.listdir(index_dir)):
+            shard_dir = os.path.join(index_dir, shard)
+            for name in sorted(os.listdir(shard_dir)):
+                with open(os.path.join(shard_dir, name), encoding="utf-8") as f:
+                    yield json.load(f)
+
+
+def write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
@@ -0,0 +1,212 @@
+import time
+import random
+import asyncio
+import aiohttp
+from aiohttp import ClientError
+from aiolimiter import AsyncLimiter
+
+from .cache import PageCache
+from .metrics import METRICS
+from .ratecontrol import OVERLOAD_STATUSES, AdaptiveLimiter, parse_retry_after
+from .urls import BASE_URL, canonical_url, request_key
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RekhtaClient:
+    """One pooled aiohttp session shared by every scraping stage.
+
+    Use as ``async with RekhtaClient() as client`` and call ``fetch`` for
+    each page; connections are kept alive and reused across stages. Pages
+    go through ``cache`` (by default a PageCache configured from the
+    REKHTA_CACHE and REKHTA_CACHE_MODE environment variables, if set).
+
+    Requests in flight are bounded by ``concurrency``, an AdaptiveLimiter
+    that grows while the server answers quickly and halves on 429, 503 or
+    timeouts; ``rate_limit`` optionally adds a hard requests/sec ceiling.
+
+    Concurrent fetches of the same page, however its URL is spelled, share
+    one request and its result ("single flight"); the callers that did not
+    need a request of their own are counted as ``fetch_coalesced``.
+
+    Latency, bytes, status codes, retries and cache hits are recorded in
+    ``metrics`` (the process-wide METRICS by default), labelled by language.
+    """
+
+    def __init__(
+        self,
+        limit=100,
+        limit_per_host=50,
+        keepalive_timeout=30,
+        dns_cache_ttl=300,
+        timeout=30,
+        max_retries=5,
+        backoff=1.0,
+        rate_limit=None,
+        rate_period=1,
+        cache=None,
+        concurrency=None,
+        metrics=None,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        # Token bucket charged once per request attempt, not per caller
+        self.limiter = AsyncLimiter(rate_limit, rate_period) if rate_limit else None
+        self.cache = cache if cache is not None else PageCache.from_env()
+        if concurrency is None:
+            concurrency = AdaptiveLimiter(maximum=limit_per_host)
+        self.concurrency = concurrency
+        self.metrics = metrics if metrics is not None else METRICS
+        self.session = None
+        # request_key -> task fetching it, while the request is in flight
+        self.inflight = {}
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"Accept-Encoding": "gzip, deflate"},
+            auto_decompress=True,
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    def retry_delay(self, attempt):
+        # Exponential backoff with full jitter
+        return random.uniform(0, self.backoff * 2**attempt)
+
+    async def fetch(self, url, params=None, raw=False):
+        key = request_key(url, params)
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self.fetch_once(canonical_url(url, keep_query=True), params)
+            )
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.metrics.inc("fetch_coalesced", lang=request_lang(params))
+
+        # Shielded, so one caller giving up does not cancel it for the rest
+        result = await asyncio.shield(task)
+        if result is None:
+            return None
+
+        body, encoding = result
+        if raw:
+            return body
+        return body.decode(encoding, errors="replace")
+
+    async def fetch_once(self, url, params=None):
+        entry = None
+        if self.cache is not None:
+            entry = await asyncio.to_thread(self.cache.get, url, params)
+            if entry is not None and self.cache.mode != "revalidate":
+                self.metrics.inc("cache_hits", lang=request_lang(params))
+                body = await asyncio.to_thread(self.cache.read, entry)
+                return body, entry["encoding"]
+            if self.cache.mode == "offline":
+                print(f"Not in cache: {url} {params}")
+                return None
+
+        return await self.fetch_remote(url, params, entry)
+
+    async def request(self, url, params=None, headers=None):
+        if self.limiter is not None:
+            await self.limiter.acquire()
+        start = await self.concurrency.acquire()
+        latency, overloaded = None, False
+        lang = request_lang(params)
+        try:
+            async with self.session.get(
+                url, params=params, headers=headers
+            ) as response:
+                body = await response.read() if response.status == 200 else None
+                encoding = response.get_encoding() if body is not None else None
+                elapsed = time.monotonic() - start
+                overloaded = response.status in OVERLOAD_STATUSES
+                if response.status < 400:
+                    # Only successful responses may widen the window
+                    latency = elapsed
+                self.metrics.observe("fetch_seconds", elapsed, lang=lang)
+                self.metrics.inc("fetch_status", status=response.status, lang=lang)
+                if body is not None:
+                    self.metrics.inc("fetch_bytes", len(body), lang=lang)
+                return response.status, body, encoding, response.headers
+        except (ClientError, asyncio.TimeoutError) as e:
+            overloaded = isinstance(e, asyncio.TimeoutError)
+            self.metrics.inc("fetch_errors", error=type(e).__name__, lang=lang)
+            raise
+        finally:
+            await self.concurrency.release(start, latency, overloaded)
+
+    async def fetch_remote(self, url, params=None, entry=None):
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        for attempt in range(self.max_retries):
+            retry_after = None
+            try:
+                status, body, encoding, response_headers = await self.request(
+                    url, params, headers
+                )
+                if status == 304 and entry is not None:
+                    await asyncio.to_thread(self.cache.touch, url, params, entry)
+                    body = await asyncio.to_thread(self.cache.read, entry)
+                    return body, entry["encoding"]
+                if status == 200:
+                    if self.cache is not None:
+                        await asyncio.to_thread(
+                            self.cache.put,
+                            url,
+                            params,
+                            body,
+                            encoding,
+                            response_headers.get("ETag"),
+                            response_headers.get("Last-Modified"),
+                        )
+                    return body, encoding
+                if status not in RETRY_STATUSES:
+                    print(f"Got status {status} for {url} {params}")
+                    return None
+
+                print(f"Attempt {attempt + 1}: Got status {status} for {url}")
+                retry_after = parse_retry_after(response_headers.get("Retry-After"))
+                if retry_after is not None:
+                    self.concurrency.pause(retry_after)
+            except (ClientError, asyncio.TimeoutError) as e:
+                print(f"Attempt {attempt + 1}: {type(e).__name__} for {url}: {str(e)}")
+
+            if attempt < self.max_retries - 1:
+                self.metrics.inc("fetch_retries", lang=request_lang(params))
+                delay = self.retry_delay(attempt)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                await asyncio.sleep(delay)
+
+        print(f"Failed to fetch {url} after {self.max_retries} attempts")
+        return None
+
+
+def request_lang(params):
+    if params and "lang" in params:
+        return params["lang"]
+    return "none"
@@ -0,0 +1,67 @@
+import json
+
+# Flattens the scraped dumps into one row per text: ghazal and nazm dumps
+# are poet -> url -> {lang: text}, the sher dump is poet -> [{lang: text}].
+# Shers have no URL of their own and are identified by the poet and their
+# position in the poet's list. iter_couplets goes one step further and also
+# splits ghazals and nazms into couplets (stanzas are separated by a blank
+# line), numbering them the same way.
+
+CORPUS_FORMS = ("ghazals", "nazms", "shers")
+# The forms with a page (and URL) per poem
+POEM_FORMS = ("ghazals", "nazms")
+# Where the scrapers keep each dump, and the journal of texts fetched since
+# it was last written
+DUMP_FILES = {
+    "ghazals": "data/rekhta_all_poets_ghazals.json",
+    "nazms": "data/rekhta_all_poets_nazms.json",
+    "shers": "data/rekhta_all_poets_shers.json",
+}
+JOURNAL_FILES = {
+    "ghazals": "data/rekhta_all_poets_ghazals.journal.jsonl",
+    "nazms": "data/rekhta_all_poets_nazms.journal.jsonl",
+    "shers": "data/rekhta_all_poets_shers.journal.jsonl",
+}
+
+
+def load_dump(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_rows(form, dump):
+    if form == "shers":
+        for poet, shers in dump.items():
+            for index, sher in enumerate(shers):
+                for lang, text in sher.items():
+                    if text is not None:
+                        yield make_row(poet, form, None, index, lang, text)
+    else:
+        for poet, poems in dump.items():
+            for url, langs in poems.items():
+                for lang, text in langs.items():
+                    if text is not None:
+                        yield make_row(poet, form, url, None, lang, text)
+
+
+def iter_couplets(form, dump):
+    for row in iter_rows(form, dump):
+        if form == "shers":
+            couplets = [(row["sher"], row["text"])]
+        else:
+            couplets = enumerate(row["text"].split("\n\n"))
+        for sher, text in couplets:
+            text = text.strip()
+            if text:
+                yield make_row(row["poet"], form, row["url"], sher, row["lang"], text)
+
+
+def make_row(poet, form, url, sher, lang, text):
+    return {
+        "poet": poet,
+        "form": form,
+        "url": url,
+        "sher": sher,
+        "lang": lang,
+        "text": text,
+    }
@@ -0,0 +1,115 @@
+import random
+import hashlib
+from multiprocessing import Pool
+
+from .normalize import normalize_text
+
+# MinHash/LSH near-duplicate detection. Each text becomes the set of its
+# character n-grams (after search normalization, so spelling variants
+# collide), summarised by NUM_PERM min-hashes. Signatures are cut into BANDS
+# bands; texts sharing any band land in the same bucket and become
+# candidates, which are then confirmed by their estimated Jaccard
+# similarity. With 16 bands of 8 rows a pair of similarity s shares a
+# bucket with probability 1 - (1 - s^8)^16: about 0.61 at 0.7 (the
+# midpoint of the curve), 0.95 at the 0.8 threshold, 0.9999 at 0.9, and
+# 0.06 at 0.5.
+
+NUM_PERM = 128
+BANDS = 16
+SHINGLE_SIZE = 5
+THRESHOLD = 0.8
+
+_permutations = None
+
+
+def make_permutations(num_perm=NUM_PERM, seed=1):
+    # Each "permutation" XORs the 64-bit shingle hashes with a random mask,
+    # which lets min() run over map() in C instead of a Python loop
+    rng = random.Random(seed)
+    return [rng.getrandbits(64) for _ in range(num_perm)]
+
+
+def shingle_hash(shingle):
+    digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    text = normalize_text(text)
+    count = max(1, len(text) - size + 1)
+    return {shingle_hash(text[i : i + size]) for i in range(count)}
+
+
+def minhash(text, permutations):
+    hashes = shingles(text)
+    return tuple(min(map(mask.__xor__, hashes)) for mask in permutations)
+
+
+def init_worker(permutations):
+    global _permutations
+    _permutations = permutations
+
+
+def signature_job(text):
+    return minhash(text, _permutations)
+
+
+def compute_signatures(texts, workers=None, permutations=None, chunksize=256):
+    """MinHash signatures for ``texts``, in order, across ``workers`` processes."""
+    permutations = permutations or make_permutations()
+    if workers == 0:
+        return [minhash(text, permutations) for text in texts]
+    with Pool(workers, initializer=init_worker, initargs=(permutations,)) as pool:
+        return pool.map(signature_job, texts, chunksize=chunksize)
+
+
+def similarity(a, b):
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def band_buckets(signatures, bands=BANDS):
+    """Yield the indices sharing each band's bucket, for buckets of 2+."""
+    rows = len(signatures[0]) // bands if signatures else 0
+    for band in range(bands):
+        buckets = {}
+        for i, signature in enumerate(signatures):
+            key = signature[band * rows : (band + 1) * rows]
+            buckets.setdefault(key, []).append(i)
+        for members in buckets.values():
+            if len(members) > 1:
+                yield members
+
+
+def find_clusters(signatures, bands=BANDS, threshold=THRESHOLD):
+    """Group near-duplicate texts; returns lists of indices, size >= 2."""
+    parent = list(range(len(signatures)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for members in band_buckets(signatures, bands):
+        # Each member is checked against one text per cluster found in the
+        # bucket so far, not against every other member: a bucket of k
+        # copies of one text costs k - 1 comparisons, not k^2 / 2
+        roots = []
+        for i in members:
+            root_i = find(i)
+            matched = False
+            for n, j in enumerate(roots):
+                root_j = find(j)
+                if root_j == root_i:
+                    matched = True
+                elif similarity(signatures[i], signatures[j]) >= threshold:
+                    parent[max(root_i, root_j)] = min(root_i, root_j)
+                    root_i = find(i)
+                    matched = True
+            if not matched:
+                roots.append(i)
+
+    clusters = {}
+    for i in range(len(signatures)):
+        clusters.setdefault(find(i), []).append(i)
+    return [members for members in clusters.values() if len(members) > 1]
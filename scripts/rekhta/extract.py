@@ -0,0 +1,203 @@
+import os
+import importlib
+from urllib.parse import parse_qs, urlparse
+from bs4 import BeautifulSoup
+
+from .urls import canonical_url
+
+LANGS = ["en-rm", "en", "hi", "ur"]
+
+# en-rm and en are both on the lang=en page, in the data-roman="on" and
+# data-roman="off" blocks respectively, so they share a single request
+LANG_PAGES = {"en-rm": "en", "en": "en", "hi": "hi", "ur": "ur"}
+
+POEM_LIST_CLASS = (
+    "contentListBody contentLoadMoreSection rt_miriyaatSec rt_manageColumn"
+)
+SHER_LIST_CLASS = "sherContainer contentLoadMoreSection nwPoetSher fixed_Quote"
+# Characters stripped around a sher's text (None strips all whitespace)
+SHER_STRIP = "\n"
+
+# Query parameter the paged listing endpoints take, and attributes the
+# load-more containers use to announce how many pages there are
+PAGE_PARAM = "page"
+PAGE_COUNT_ATTRS = ("data-totalpages", "data-total-pages", "data-pagecount")
+
+# Modules exposing extract_poem, extract_shers and extract_links; anything
+# a backend lacks (e.g. extract_poets) falls back to BeautifulSoup
+BACKENDS = {"bs4": ".extract", "lxml": ".extract_lxml"}
+DEFAULT_BACKEND = os.environ.get("REKHTA_PARSER", "bs4")
+
+
+def get_extractor(kind, backend=None):
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown parser backend {backend!r}, pick one of {list(BACKENDS)}"
+        )
+
+    module = importlib.import_module(BACKENDS[backend], __package__)
+    name = f"extract_{kind}"
+    if not hasattr(module, name):
+        module = importlib.import_module(BACKENDS["bs4"], __package__)
+    return getattr(module, name)
+
+
+def make_soup(html):
+    # Pages arrive as raw bytes so they can be shipped to parse workers as-is
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+    return BeautifulSoup(html, "html.parser")
+
+
+def plan_fetches(langs):
+    plan = {}
+    for lang in langs:
+        plan.setdefault(LANG_PAGES[lang], []).append(lang)
+    return plan
+
+
+def scrape_lines(poem_div, chars=None):
+    lines = []
+    sections = poem_div.find_all("div", class_="w")
+    for section in sections:
+        poem_lines = section.find_all("p")
+        for poem_line in poem_lines:
+            lines.append(poem_line.text)
+        lines.append("")
+    return "\n".join(lines).strip(chars)
+
+
+def find_poem_div(section, lang):
+    if lang == "en-rm":
+        return section.find("div", {"class": "pMC", "data-roman": "on"})
+    if lang == "en":
+        return section.find("div", {"class": "pMC", "data-roman": "off"})
+
+    poem_divs = section.find("div", {"class": "pMC", "data-roman": "on"})
+    if poem_divs is None:
+        poem_divs = section.find("div", {"class": "pMC", "data-roman": "off"})
+    return poem_divs
+
+
+def extract_variant(section, lang, chars=None):
+    poem_divs = find_poem_div(section, lang)
+    if poem_divs is None:
+        return None
+
+    for div in poem_divs.find_all("div", {"class": "t"}):
+        div.decompose()
+    return scrape_lines(poem_divs, chars)
+
+
+def extract_poem(html, variants):
+    soup = make_soup(html)
+
+    poem_section = soup.find("div", {"class": "mainPageWrap NewPoem"})
+    if poem_section is None:
+        poem_section = soup.find("div", {"class": "rfGhazal"})
+    if poem_section is None:
+        return {}
+
+    poems = {}
+    for variant in variants:
+        poem = extract_variant(poem_section, variant)
+        if poem is not None:
+            poems[variant] = poem
+    return poems
+
+
+def extract_shers(html, variants):
+    soup = make_soup(html)
+
+    shers = {variant: [] for variant in variants}
+    main_shers_section = soup.find("div", {"class": SHER_LIST_CLASS})
+    if main_shers_section is None:
+        return shers
+
+    for sher_section in main_shers_section.find_all("div", class_="sherSection"):
+        # None for a variant the section lacks (e.g. no romanised div), so
+        # every variant's list keeps one entry per sher and stays aligned.
+        # Only newlines are stripped, as the sher dump always had them:
+        # trailing spaces are kept until it is regenerated.
+        for variant in variants:
+            sher = extract_variant(sher_section, variant, SHER_STRIP)
+            shers[variant].append(sher)
+    return shers
+
+
+def is_site_link(href):
+    # Keep absolute and relative links, drop protocol-relative ones; plain
+    # http is accepted too so a local mock server can stand in for the site
+    if not href:
+        return False
+    return "//" not in href.replace("https://", "").replace("http://", "")
+
+
+def extract_links(html):
+    soup = make_soup(html)
+
+    content_section = soup.find("div", {"class": POEM_LIST_CLASS})
+    links = content_section.find_all("a") if content_section is not None else []
+
+    hrefs = []
+    for link in links:
+        if is_site_link(link.get("href")):
+            hrefs.append(canonical_url(link["href"]))
+    return hrefs
+
+
+def extract_poets(html):
+    soup = make_soup(html)
+
+    poets = []
+    for poet_div in soup.find_all("div", class_="poetColumn"):
+        name_div = poet_div.find("div", class_="poetNameDatePlace")
+        name_a = name_div.find("a")
+        name = name_a.text.strip()
+        href = canonical_url(name_a["href"])
+
+        location_div = poet_div.find("div", class_="poetPlaceDate")
+        location_a = location_div.find("a")
+        location_a = location_a.text if location_a is not None else None
+
+        active_years = poet_div.find("span", class_="poetListDate")
+        if active_years:
+            active_years = active_years.text.strip()
+        else:
+            active_years = None
+        description = poet_div.find("div", class_="poetDescColumn")
+        if description and description.find("p"):
+            description = description.find("p").text.strip()
+        else:
+            description = None
+
+        poet = {
+            "name": name,
+            "href": href,
+            "location": location_a,
+            "active_years": active_years,
+            "description": description,
+        }
+        poets.append(poet)
+    return poets
+
+
+def extract_page_count(html):
+    soup = make_soup(html)
+
+    page_count = 1
+    for section in soup.find_all("div", class_="contentLoadMoreSection"):
+        for attr in PAGE_COUNT_ATTRS:
+            value = section.get(attr, "")
+            if value.isdigit():
+                page_count = max(page_count, int(value))
+
+        # Only the listing's own paging links: menus and footers elsewhere
+        # on the page can carry a page parameter of their own
+        for link in section.find_all("a", href=True):
+            query = parse_qs(urlparse(link["href"]).query)
+            for value in query.get(PAGE_PARAM, []):
+                if value.isdigit():
+                    page_count = max(page_count, int(value))
+    return page_count
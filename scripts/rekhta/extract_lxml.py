@@ -0,0 +1,115 @@
+from lxml import etree, html as lxml_html
+
+from .extract import POEM_LIST_CLASS, SHER_LIST_CLASS, SHER_STRIP, is_site_link
+from .urls import canonical_url
+
+
+def has_class(name):
+    # Same token match BeautifulSoup does for {"class": name}
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+POEM_SECTION = etree.XPath('//div[@class="mainPageWrap NewPoem"]')
+RF_GHAZAL_SECTION = etree.XPath(f"//*[{has_class('rfGhazal')}]")
+SHER_LIST = etree.XPath(f'//div[@class="{SHER_LIST_CLASS}"]')
+SHER_SECTIONS = etree.XPath(f".//div[{has_class('sherSection')}]")
+POEM_LIST = etree.XPath(f'//div[@class="{POEM_LIST_CLASS}"]')
+LINKS = etree.XPath(".//a")
+ROMAN_ON = etree.XPath(f".//div[{has_class('pMC')} and @data-roman='on']")
+ROMAN_OFF = etree.XPath(f".//div[{has_class('pMC')} and @data-roman='off']")
+TRANSLATIONS = etree.XPath(f".//div[{has_class('t')}]")
+SECTIONS = etree.XPath(f".//div[{has_class('w')}]")
+LINES = etree.XPath(".//p")
+
+
+def make_tree(html):
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+    return lxml_html.document_fromstring(html)
+
+
+def first(xpath, node):
+    found = xpath(node)
+    return found[0] if found else None
+
+
+def scrape_lines(poem_div, chars=None):
+    lines = []
+    for section in SECTIONS(poem_div):
+        for poem_line in LINES(section):
+            lines.append(poem_line.text_content())
+        lines.append("")
+    return "\n".join(lines).strip(chars)
+
+
+def find_poem_div(section, lang):
+    if lang == "en-rm":
+        return first(ROMAN_ON, section)
+    if lang == "en":
+        return first(ROMAN_OFF, section)
+
+    poem_divs = first(ROMAN_ON, section)
+    if poem_divs is None:
+        poem_divs = first(ROMAN_OFF, section)
+    return poem_divs
+
+
+def extract_variant(section, lang, chars=None):
+    poem_divs = find_poem_div(section, lang)
+    if poem_divs is None:
+        return None
+
+    for div in TRANSLATIONS(poem_divs):
+        # drop_tree keeps the tail text, like BeautifulSoup's decompose
+        div.drop_tree()
+    return scrape_lines(poem_divs, chars)
+
+
+def extract_poem(html, variants):
+    tree = make_tree(html)
+
+    poem_section = first(POEM_SECTION, tree)
+    if poem_section is None:
+        poem_section = first(RF_GHAZAL_SECTION, tree)
+    if poem_section is None:
+        return {}
+
+    poems = {}
+    for variant in variants:
+        poem = extract_variant(poem_section, variant)
+        if poem is not None:
+            poems[variant] = poem
+    return poems
+
+
+def extract_shers(html, variants):
+    tree = make_tree(html)
+
+    shers = {variant: [] for variant in variants}
+    main_shers_section = first(SHER_LIST, tree)
+    if main_shers_section is None:
+        return shers
+
+    for sher_section in SHER_SECTIONS(main_shers_section):
+        # None for a variant the section lacks (e.g. no romanised div), so
+        # every variant's list keeps one entry per sher and stays aligned.
+        # Only newlines are stripped, as the sher dump always had them:
+        # trailing spaces are kept until it is regenerated.
+        for variant in variants:
+            sher = extract_variant(sher_section, variant, SHER_STRIP)
+            shers[variant].append(sher)
+    return shers
+
+
+def extract_links(html):
+    tree = make_tree(html)
+
+    content_section = first(POEM_LIST, tree)
+    links = LINKS(content_section) if content_section is not None else []
+
+    hrefs = []
+    for link in links:
+        href = link.get("href")
+        if is_site_link(href):
+            hrefs.append(canonical_url(href))
+    return hrefs
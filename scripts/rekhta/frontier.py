@@ -0,0 +1,185 @@
+import time
+import sqlite3
+import threading
+
+# A crawl frontier shared by several worker processes, possibly on several
+# hosts, through one SQLite file. Workers claim batches of poem URLs under a
+# lease; a claim is a single write transaction, so two workers never get the
+# same URL. Leases are renewed while a batch is being fetched, and a lease
+# that runs out (its worker died or hung) makes the URL claimable again.
+#
+# WAL mode needs shared memory, so it only works with every worker on one
+# host. Workers on several hosts sharing a filesystem must open the frontier
+# with wal=False (rollback journal), which relies on the filesystem's fcntl
+# locks being honoured across hosts.
+#
+# A Frontier may be used from several threads (e.g. through
+# asyncio.to_thread); its methods take turns on the one connection.
+
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frontier (
+    url TEXT PRIMARY KEY,
+    poet TEXT NOT NULL,
+    form TEXT NOT NULL,
+    langs TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS frontier_status ON frontier (status, lease_until);
+"""
+
+
+class Frontier:
+    """Lease-based work queue of poem URLs on a shared SQLite file.
+
+    Each item is (url, poet, form, langs), langs being the languages still
+    to fetch. Items go pending -> leased -> done, or back to pending when
+    released or when their lease expires; after MAX_ATTEMPTS claims an
+    item that keeps failing, or keeps losing its lease, is parked as failed.
+    """
+
+    def __init__(self, path, wal=True, timeout=60):
+        self.path = path
+        self.lock = threading.Lock()
+        # Transactions are managed by hand, so claims can BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self.conn.execute(f"PRAGMA journal_mode = {'WAL' if wal else 'DELETE'}")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def transaction(self):
+        return Transaction(self.conn, self.lock)
+
+    def add(self, items):
+        """Queue items; returns how many were added or queued again.
+
+        An item already done or failed is put back to pending with a fresh
+        set of attempts, since it is only added while languages are still
+        missing. Items under lease are left to their worker.
+        """
+        with self.transaction():
+            cursor = self.conn.executemany(
+                "INSERT INTO frontier (url, poet, form, langs) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (url) DO UPDATE SET langs = excluded.langs,"
+                " status = 'pending', owner = NULL, lease_until = NULL,"
+                " attempts = 0 WHERE frontier.status != 'leased'",
+                [
+                    (url, poet, form, ",".join(langs))
+                    for url, poet, form, langs in items
+                ],
+            )
+        return cursor.rowcount
+
+    def claim(
+        self, owner, batch_size, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS
+    ):
+        now = time.time()
+        with self.transaction():
+            # An item whose worker died with it on every attempt is given up
+            self.conn.execute(
+                "UPDATE frontier SET status = 'failed', lease_until = NULL"
+                " WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, max_attempts),
+            )
+            rows = self.conn.execute(
+                "SELECT url, poet, form, langs, status FROM frontier"
+                " WHERE status = 'pending'"
+                " OR (status = 'leased' AND lease_until < ?)"
+                " LIMIT ?",
+                (now, batch_size),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE frontier SET status = 'leased', owner = ?, lease_until = ?,"
+                " attempts = attempts + 1 WHERE url = ?",
+                [(owner, now + lease_seconds, row[0]) for row in rows],
+            )
+        reclaimed = sum(status == "leased" for *_, status in rows)
+        items = [
+            (url, poet, form, langs.split(",")) for url, poet, form, langs, _ in rows
+        ]
+        return items, reclaimed
+
+    def renew(self, owner, urls, lease_seconds=LEASE_SECONDS):
+        """Extend the leases ``owner`` still holds; returns how many it holds."""
+        with self.transaction():
+            cursor = self.conn.executemany(
+                "UPDATE frontier SET lease_until = ?"
+                " WHERE url = ? AND owner = ? AND status = 'leased'",
+                [(time.time() + lease_seconds, url, owner) for url in urls],
+            )
+        return cursor.rowcount
+
+    def complete(self, owner, urls):
+        with self.transaction():
+            self.conn.executemany(
+                "UPDATE frontier SET status = 'done', lease_until = NULL"
+                " WHERE url = ? AND owner = ?",
+                [(url, owner) for url in urls],
+            )
+
+    def release(self, owner, remaining, max_attempts=MAX_ATTEMPTS):
+        """Give back URLs that were not fully fetched, for another attempt.
+
+        ``remaining`` maps each URL to the languages still missing.
+        """
+        with self.transaction():
+            self.conn.executemany(
+                "UPDATE frontier SET langs = ?, lease_until = NULL, status = CASE"
+                " WHEN attempts >= ? THEN 'failed' ELSE 'pending' END"
+                " WHERE url = ? AND owner = ? AND status = 'leased'",
+                [
+                    (",".join(langs), max_attempts, url, owner)
+                    for url, langs in remaining.items()
+                ],
+            )
+
+    def next_expiry(self):
+        """Seconds until the earliest lease held by anyone runs out, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT MIN(lease_until) FROM frontier WHERE status = 'leased'"
+            ).fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def counts(self):
+        sql = "SELECT status, COUNT(*) FROM frontier GROUP BY status"
+        with self.lock:
+            return dict(self.conn.execute(sql))
+
+
+class Transaction:
+    def __init__(self, conn, lock):
+        self.conn = conn
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.acquire()
+        # Take the write lock up front, so concurrent claims queue up on the
+        # busy timeout instead of failing when they upgrade from a read
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self.lock.release()
+            raise
+
+    def __exit__(self, exc_type, *exc_info):
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.lock.release()
@@ -0,0 +1,304 @@
+import os
+import json
+import time
+from array import array
+
+from .extract import LANGS
+from .metrics import METRICS
+from .seen import iter_items, key_hash, load_seen, poem_keys, poet_keys, write_sidecar
+
+# Append-only JSONL journals. Poem journals hold one {"poet", "url", "lang",
+# "text"} record per line and fold into the nested poet -> url -> lang dump
+# (compact_journal from a dump in memory, compact_poems streamed from disk);
+# RecordWriter journals hold one whole record per line (e.g. a poet's shers)
+# and fold into a flat key -> value dump with compact_records.
+
+
+def append_journal(journal, poet, url, lang, text):
+    record = {"poet": poet, "url": url, "lang": lang, "text": text}
+    with METRICS.timer("write_seconds", op="journal"):
+        journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        journal.flush()
+
+
+def replay_journal(journal_file, dump):
+    if not os.path.exists(journal_file):
+        return 0
+
+    replayed = 0
+    with open(journal_file, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write leaves a partial last line, skip it
+                continue
+            poet_poems = dump.setdefault(record["poet"], {})
+            poet_poems.setdefault(record["url"], {})[record["lang"]] = record["text"]
+            replayed += 1
+    return replayed
+
+
+def read_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(data, path):
+    tmp_path = path + ".tmp"
+    with METRICS.timer("write_seconds", op="dump"):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+
+def compact_journal(dump, dump_file, journal_file):
+    write_json(dump, dump_file)
+
+    if os.path.exists(journal_file):
+        os.remove(journal_file)
+
+
+class RecordWriter:
+    """Buffered append-only JSONL writer with periodic fsync checkpoints.
+
+    At most ``buffer_size`` records are held in memory; the buffer is
+    written out and fsynced whenever it fills or ``fsync_interval`` seconds
+    have passed, so a slow trickle of records still reaches the disk and
+    progress survives a crash or power loss.
+    """
+
+    def __init__(self, path, buffer_size=64, fsync_interval=30):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.fsync_interval = fsync_interval
+        self.buffer = []
+        self.last_fsync = time.monotonic()
+        self.file = open(path, "a", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, record):
+        self.buffer.append(json.dumps(record, ensure_ascii=False) + "\n")
+        if (
+            len(self.buffer) >= self.buffer_size
+            or time.monotonic() - self.last_fsync >= self.fsync_interval
+        ):
+            self.flush()
+
+    def flush(self):
+        with METRICS.timer("write_seconds", op="journal"):
+            if self.buffer:
+                self.file.write("".join(self.buffer))
+                self.buffer.clear()
+            self.file.flush()
+        if time.monotonic() - self.last_fsync >= self.fsync_interval:
+            self.checkpoint()
+
+    def checkpoint(self):
+        with METRICS.timer("write_seconds", op="fsync"):
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        self.last_fsync = time.monotonic()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.checkpoint()
+        self.file.close()
+
+
+def iter_records(journal_file):
+    if not os.path.exists(journal_file):
+        return
+    with open(journal_file, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write leaves a partial last line, skip it
+                continue
+
+
+def load_done_keys(dump_file, journal_file, key="poet"):
+    journal_keys = ((record[key],) for record in iter_records(journal_file))
+    return DoneKeys(load_seen(dump_file, poet_keys, journal_keys))
+
+
+class DoneKeys:
+    """``key in done`` over a SeenIndex of 1-tuples."""
+
+    def __init__(self, seen):
+        self.seen = seen
+
+    def __contains__(self, key):
+        return (key,) in self.seen
+
+    def __len__(self):
+        return len(self.seen)
+
+
+def compact_records(dump_file, journal_file, key="poet", value="shers"):
+    """Fold ``{key: ..., value: ...}`` journal records into a flat JSON dump.
+
+    Journal records are newer, so they replace dump entries with the same
+    key. Output is streamed entry by entry in the same layout as
+    ``json.dump(..., indent=2)``, and journal records are read back by
+    offset, so neither file is ever held in memory whole.
+    """
+    with METRICS.timer("write_seconds", op="compact"):
+        stream_records(dump_file, journal_file, key, value)
+
+    if os.path.exists(journal_file):
+        os.remove(journal_file)
+
+
+def stream_records(dump_file, journal_file, key, value):
+    offsets = journal_offsets(journal_file, key)
+    journal = open(journal_file, "rb") if offsets else None
+
+    def latest(entry_key):
+        journal.seek(offsets.pop(entry_key)[-1])
+        return json.loads(journal.readline())[value]
+
+    def items():
+        for entry_key, entry_value in iter_items(dump_file):
+            if entry_key in offsets:
+                entry_value = latest(entry_key)
+            yield entry_key, entry_value
+        for entry_key in list(offsets):
+            yield entry_key, latest(entry_key)
+
+    try:
+        write_items(items(), dump_file)
+    finally:
+        if journal is not None:
+            journal.close()
+
+
+def write_items(items, path):
+    """Write ``(key, value)`` pairs as a JSON object, one at a time.
+
+    The layout is the same as ``json.dump(..., indent=2)`` of the dict.
+    """
+    tmp_path = path + ".tmp"
+    separator = "\n  "
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("{")
+        for entry_key, entry_value in items:
+            body = json.dumps(entry_value, ensure_ascii=False, indent=2)
+            f.write(separator + json.dumps(entry_key, ensure_ascii=False) + ": ")
+            f.write(body.replace("\n", "\n  "))
+            separator = ",\n  "
+        f.write("}" if separator == "\n  " else "\n}")
+    os.replace(tmp_path, path)
+
+
+def journal_offsets(journal_file, key="poet"):
+    # key -> byte offsets of its records, so they can be read back in groups
+    offsets = {}
+    if not os.path.exists(journal_file):
+        return offsets
+    with open(journal_file, "rb") as f:
+        offset = 0
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                pass
+            else:
+                offsets.setdefault(record[key], array("Q")).append(offset)
+            offset += len(line)
+    return offsets
+
+
+def sort_poems(poems, urls):
+    # Listed URLs in list order, then any others as they were; languages
+    # in LANGS order
+    rank = {url: i for i, url in enumerate(urls)}
+    ordered = sorted(poems.items(), key=lambda item: rank.get(item[0], len(rank)))
+    return {
+        url: {
+            **{lang: texts[lang] for lang in LANGS if lang in texts},
+            **{lang: text for lang, text in texts.items() if lang not in LANGS},
+        }
+        for url, texts in ordered
+    }
+
+
+def compact_poems(dump_file, journal_file, order=None):
+    """Fold a poem journal into the nested poet -> url -> lang dump.
+
+    Like ``compact_journal``, but streamed: the dump is rewritten one poet at
+    a time, with that poet's journal records read back by offset, so neither
+    file is ever held in memory whole. Also leaves the dump's seen-key
+    sidecar up to date for the next resume.
+
+    ``order`` yields (poet, urls) in poems list order. With it, the dump is
+    written in that order whatever order the texts were fetched in, so two
+    runs over the same pages write the same file; poets and URLs not on the
+    list follow the listed ones. Once a dump is in order this streams as
+    before; the first compaction of an unordered dump holds the poets that
+    come early in it until their turn.
+    """
+    offsets = journal_offsets(journal_file)
+    hashes = array("Q")
+    journal = open(journal_file, "rb") if offsets else None
+
+    def merge(poet, poems, urls=()):
+        for offset in offsets.pop(poet, ()):
+            journal.seek(offset)
+            record = json.loads(journal.readline())
+            poems.setdefault(record["url"], {})[record["lang"]] = record["text"]
+        poems = sort_poems(poems, urls)
+        hashes.extend(key_hash(*key) for key in poem_keys(poet, poems))
+        return poet, poems
+
+    def items():
+        dump = iter_items(dump_file)
+        if order is None:
+            for poet, poems in dump:
+                yield merge(poet, poems)
+        else:
+            # Keys only, to know which listed poets to wait for in the dump
+            dump_poets = {poet for poet, _ in iter_items(dump_file)}
+            pending, written = {}, set()
+            for poet, urls in order:
+                if poet in written:
+                    continue
+                if poet in dump_poets:
+                    while poet not in pending:
+                        entry_key, entry_value = next(dump)
+                        pending[entry_key] = entry_value
+                    yield merge(poet, pending.pop(poet), urls)
+                elif poet in offsets:
+                    yield merge(poet, {}, urls)
+                else:
+                    continue
+                written.add(poet)
+            for poet, poems in pending.items():
+                yield merge(poet, poems)
+            for poet, poems in dump:
+                if poet not in written:
+                    yield merge(poet, poems)
+        for poet in list(offsets):
+            yield merge(poet, {})
+
+    try:
+        with METRICS.timer("write_seconds", op="compact"):
+            write_items(items(), dump_file)
+    finally:
+        if journal is not None:
+            journal.close()
+    hashes = array("Q", sorted(hashes))
+    write_sidecar(dump_file + ".seen", os.stat(dump_file), hashes)
+
+    if os.path.exists(journal_file):
+        os.remove(journal_file)
@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+
+METRICS_DIR = os.environ.get("REKHTA_METRICS_DIR", "data/metrics")
+REPORT_INTERVAL = 30
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HELP = {
+    "fetch_seconds": "Latency of HTTP requests",
+    "fetch_bytes": "Response body bytes received",
+    "fetch_status": "HTTP responses by status code",
+    "fetch_retries": "Request attempts that were retried",
+    "fetch_errors": "Requests that raised a client error or timed out",
+    "cache_hits": "Pages served from the page cache",
+    "fetch_coalesced": "Fetches that shared a request already in flight",
+    "parse_seconds": "Time spent extracting text from a page",
+    "write_seconds": "Time spent writing journals and dumps",
+}
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "buckets": dict(zip(map(str, self.buckets), self.counts)),
+        }
+
+
+class Metrics:
+    """Counters and histograms keyed by name and labels, for one process.
+
+    Every observation also carries the ``stage`` label of the run, set by
+    ``report_metrics``.
+    """
+
+    def __init__(self):
+        self.stage = "default"
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {}
+
+    def key(self, name, labels):
+        labels = {"stage": self.stage, **labels}
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self.key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self.key(name, labels)
+        if key not in self.histograms:
+            self.histograms[key] = Histogram()
+        self.histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def to_dict(self):
+        return {
+            "started": self.started,
+            "elapsed": time.time() - self.started,
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ],
+            "histograms": [
+                {"name": name, "labels": dict(labels), **histogram.to_dict()}
+                for (name, labels), histogram in sorted(self.histograms.items())
+            ],
+        }
+
+    def to_prometheus(self):
+        lines = []
+        described = set()
+
+        def describe(name, kind, suffix=""):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP rekhta_{name}{suffix} {HELP.get(name, name)}")
+                lines.append(f"# TYPE rekhta_{name}{suffix} {kind}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            describe(name, "counter", "_total")
+            lines.append(f"rekhta_{name}_total{format_labels(labels)} {value}")
+
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            describe(name, "histogram")
+            bounds = list(map(str, histogram.buckets)) + ["+Inf"]
+            counts = histogram.counts + [histogram.count]
+            for bound, count in zip(bounds, counts):
+                bucket_labels = format_labels(labels + (("le", bound),))
+                lines.append(f"rekhta_{name}_bucket{bucket_labels} {count}")
+            label_text = format_labels(labels)
+            lines.append(f"rekhta_{name}_sum{label_text} {histogram.sum}")
+            lines.append(f"rekhta_{name}_count{label_text} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, metrics_dir=METRICS_DIR):
+        os.makedirs(metrics_dir, exist_ok=True)
+        path = os.path.join(metrics_dir, self.stage)
+        for suffix, data in (
+            (".json", json.dumps(self.to_dict(), indent=2)),
+            (".prom", self.to_prometheus()),
+        ):
+            with open(path + suffix + ".tmp", "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(path + suffix + ".tmp", path + suffix)
+        return path
+
+    def summary(self):
+        lines = []
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            label_text = ",".join(f"{k}={v}" for k, v in labels if k != "stage")
+            mean = histogram.sum / histogram.count
+            lines.append(
+                f"{name}[{label_text}]: n={histogram.count} "
+                f"mean={mean:.4f} total={histogram.sum:.1f}"
+            )
+        for (name, labels), value in sorted(self.counters.items()):
+            label_text = ",".join(f"{k}={v}" for k, v in labels if k != "stage")
+            lines.append(f"{name}[{label_text}]: {value}")
+        return "\n".join(lines)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+METRICS = Metrics()
+
+
+@asynccontextmanager
+async def report_metrics(stage, interval=REPORT_INTERVAL, metrics_dir=METRICS_DIR):
+    """Label this run's metrics with ``stage`` and export them to metrics_dir
+    every ``interval`` seconds and once more, with a summary, at the end."""
+    METRICS.stage = stage
+
+    async def report_periodically():
+        while True:
+            await asyncio.sleep(interval)
+            METRICS.write_report(metrics_dir)
+
+    reporter = asyncio.create_task(report_periodically())
+    try:
+        yield METRICS
+    finally:
+        reporter.cancel()
+        path = METRICS.write_report(metrics_dir)
+        print(METRICS.summary())
+        print(f"Metrics written to {path}.json and {path}.prom")
@@ -0,0 +1,221 @@
+import random
+import asyncio
+from aiohttp import web
+
+from .cache import PageCache
+from .extract import PAGE_PARAM, POEM_LIST_CLASS, SHER_LIST_CLASS
+
+# Where recorded pages (a PageCache filled by a real run) were fetched from;
+# links to it inside recorded pages are rewritten to point at the mock
+RECORDED_SITE = "https://www.rekhta.org"
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+WORDS = ["dil", "ishq", "shab", "chand", "raat", "gham", "khwab", "sahar", "yaad"]
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>{title}</title></head>
+<body>{filler}
+{content}
+</body></html>"""
+
+
+class MockSite:
+    """Synthetic rekhta.org: the same markup the extractors look for,
+    generated deterministically from ``seed``.
+
+    Serves the poet directory (``/poets?startswith=`` and
+    ``/poets/top-read-poets``), each poet's ``ghazals``/``nazms`` lists and
+    ``couplets``, and the poem pages themselves. Listings are split into
+    pages of ``page_size`` entries. ``latency`` (+ up to ``jitter``) seconds
+    are added to every response and a ``error_rate`` fraction of requests
+    fail with ``error_status``. ``filler_kb`` pads each page with markup
+    the extractors ignore, to get closer to real page weights.
+
+    With ``recorded`` (a PageCache directory), pages recorded from the real
+    site are served whenever the cache has the requested url and params.
+    """
+
+    def __init__(
+        self,
+        poets=20,
+        poems=10,
+        shers=30,
+        couplets=5,
+        page_size=20,
+        top_poets=10,
+        filler_kb=0,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        error_status=503,
+        recorded=None,
+        seed=0,
+    ):
+        self.poets = [f"{LETTERS[i % len(LETTERS)]}-poet-{i}" for i in range(poets)]
+        self.poems = poems
+        self.shers = shers
+        self.couplets = couplets
+        self.page_size = page_size
+        self.top_poets = top_poets
+        # Site chrome with a paged link of its own, which must not be taken
+        # for the listing's page count
+        self.filler = "<div class='nav'><a href='/t20?page=50'>T20</a>"
+        self.filler += "<span>menu</span>" * (filler_kb * 60) + "</div>"
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.recorded = PageCache(recorded, mode="offline") if recorded else None
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+
+    def make_app(self):
+        app = web.Application(middlewares=[self.middleware])
+        app.router.add_get("/poets", self.poet_directory)
+        app.router.add_get("/poets/top-read-poets", self.poet_directory)
+        app.router.add_get("/poets/{poet}/couplets", self.couplets_page)
+        app.router.add_get("/poets/{poet}/{form:ghazals|nazms}", self.poem_list)
+        app.router.add_get("/{form:ghazals|nazms}/{slug}", self.poem_page)
+        return app
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        self.requests += 1
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.random.random() < self.error_rate:
+            self.errors += 1
+            return web.Response(status=self.error_status, headers={"Retry-After": "1"})
+
+        response = self.replay(request)
+        if response is None:
+            response = await handler(request)
+        self.bytes_sent += len(response.body or b"")
+        return response
+
+    def replay(self, request):
+        if self.recorded is None:
+            return None
+        url = RECORDED_SITE + request.path
+        entry = self.recorded.get(url, dict(request.query))
+        if entry is None:
+            return None
+        body = self.recorded.read(entry)
+        body = body.replace(RECORDED_SITE.encode(), base_url(request).encode())
+        return web.Response(body=body, content_type="text/html", charset="utf-8")
+
+    def render(self, title, content):
+        html = PAGE.format(title=title, filler=self.filler, content=content)
+        return web.Response(text=html, content_type="text/html")
+
+    def paged(self, request, entries):
+        pages = max(1, -(-len(entries) // self.page_size))
+        page = request.query.get(PAGE_PARAM, "1")
+        page = int(page) if page.isdigit() else 1
+        start = (page - 1) * self.page_size
+        return pages, entries[start : start + self.page_size]
+
+    def verse(self, *parts, lines=2):
+        rng = random.Random(" ".join(map(str, (self.seed,) + parts)))
+        return [" ".join(rng.choices(WORDS, k=6)) for _ in range(lines)]
+
+    def poem_block(self, request, key, lines):
+        lang = request.query.get("lang", "ur")
+        blocks = []
+        romans = ["on", "off"] if lang == "en" else ["on"]
+        for roman in romans:
+            stanzas = []
+            for stanza, verse in enumerate(lines):
+                text = "".join(f"<p>{lang}-{roman} {line}</p>" for line in verse)
+                stanzas.append(
+                    f"<div class='w'>{text}</div>"
+                    f"<div class='t'><p>translation {key} {stanza}</p></div>"
+                )
+            blocks.append(
+                f"<div class='pMC' data-roman='{roman}'>{''.join(stanzas)}</div>"
+            )
+        return "".join(blocks)
+
+    async def poet_directory(self, request):
+        if request.path.endswith("top-read-poets"):
+            poets = self.poets[: self.top_poets]
+        else:
+            letter = request.query.get("startswith", "").lower()
+            poets = [poet for poet in self.poets if poet.startswith(letter)]
+
+        pages, poets = self.paged(request, poets)
+        base = base_url(request)
+        columns = "".join(
+            "<div class='poetColumn'>"
+            f"<div class='poetNameDatePlace'><a href='{base}/poets/{poet}'>"
+            f"{poet.replace('-', ' ').title()}</a>"
+            "<span class='poetListDate'>1900-1980</span></div>"
+            "<div class='poetPlaceDate'><a>Delhi</a></div>"
+            f"<div class='poetDescColumn'><p>About {poet}</p></div>"
+            "</div>"
+            for poet in poets
+        )
+        content = (
+            f"<div class='contentLoadMoreSection' data-totalpages='{pages}'>"
+            f"{columns}</div>"
+        )
+        return self.render("Poets", content)
+
+    async def poem_list(self, request):
+        poet, form = request.match_info["poet"], request.match_info["form"]
+        if poet not in self.poets:
+            raise web.HTTPNotFound()
+
+        slugs = [f"{poet}-{form[:-1]}-{i}" for i in range(self.poems)]
+        pages, slugs = self.paged(request, slugs)
+        base = base_url(request)
+        links = "".join(
+            f"<div class='contentListItems'><a href='{base}/{form}/{slug}'>{slug}</a>"
+            "</div>"
+            for slug in slugs
+        )
+        content = (
+            f"<div class='{POEM_LIST_CLASS}' data-totalpages='{pages}'>{links}</div>"
+        )
+        return self.render(f"{poet} {form}", content)
+
+    async def poem_page(self, request):
+        slug = request.match_info["slug"]
+        lines = [self.verse(slug, couplet) for couplet in range(self.couplets)]
+        content = (
+            "<div class='mainPageWrap NewPoem'>"
+            f"{self.poem_block(request, slug, lines)}</div>"
+        )
+        return self.render(slug, content)
+
+    async def couplets_page(self, request):
+        poet = request.match_info["poet"]
+        if poet not in self.poets:
+            raise web.HTTPNotFound()
+
+        pages, shers = self.paged(request, list(range(self.shers)))
+        sections = "".join(
+            "<div class='sherSection'>"
+            f"{self.poem_block(request, f'{poet}-{i}', [self.verse(poet, i)])}</div>"
+            for i in shers
+        )
+        content = (
+            f"<div class='{SHER_LIST_CLASS}' data-totalpages='{pages}'>"
+            f"{sections}</div>"
+        )
+        return self.render(f"{poet} couplets", content)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "bytes": self.bytes_sent,
+        }
+
+
+def base_url(request):
+    return f"{request.scheme}://{request.host}"
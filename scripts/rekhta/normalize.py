@@ -0,0 +1,46 @@
+import unicodedata
+
+# Folds the spelling variation that should not matter when searching the
+# corpus, in all three scripts:
+#   Urdu (Nastaliq)  harakat/hamza/madda dropped, Arabic yeh, kaf and heh
+#                    mapped to their Urdu forms, tatweel dropped
+#   Devanagari       nukta dropped (क़ -> क), candrabindu -> anusvara
+#   Roman            accents dropped (ā -> a, ñ -> n), case folded
+# Devanagari vowel signs and virama are combining marks too, but they carry
+# the spelling, so only marks outside the Devanagari block are dropped.
+
+DEVANAGARI = range(0x0900, 0x0980)
+
+FOLD = {
+    "\u064a": "\u06cc",  # Arabic yeh -> Farsi yeh
+    "\u0649": "\u06cc",  # alef maksura -> Farsi yeh
+    "\u0643": "\u06a9",  # Arabic kaf -> keheh
+    "\u0647": "\u06c1",  # Arabic heh -> heh goal
+    "\u06d5": "\u06c1",  # ae (left over from heh with yeh above) -> heh goal
+    "\u0640": "",  # tatweel
+    "\u200c": "",  # zero width non-joiner
+    "\u200d": "",  # zero width joiner
+    "\u093c": "",  # Devanagari nukta
+    "\u0901": "\u0902",  # candrabindu -> anusvara
+}
+
+
+def fold_char(char):
+    if char in FOLD:
+        return FOLD[char]
+    category = unicodedata.category(char)
+    if category == "Mn" and ord(char) not in DEVANAGARI:
+        return ""
+    if category[0] in "LMN":
+        return char
+    return " "
+
+
+def normalize_text(text):
+    """Return ``text`` folded for search, as space separated tokens."""
+    text = unicodedata.normalize("NFKD", text).casefold()
+    return " ".join("".join(map(fold_char, text)).split())
+
+
+def tokenize(text):
+    return normalize_text(text).split()
@@ -0,0 +1,57 @@
+import asyncio
+
+from .extract import PAGE_PARAM, extract_page_count, plan_fetches
+
+# Guard against a bogus page count turning into thousands of requests
+MAX_PAGES = 200
+
+
+async def fetch_pages(client, url, params=None, parser=None):
+    """Fetch every page of a paged listing as raw bytes, in page order.
+
+    The first page tells how many pages there are, the rest are then
+    fetched concurrently. Pages that fail to download are left out; if the
+    first one fails, the listing is unknown and None is returned, so
+    callers can tell it apart from an empty listing.
+    """
+    first = await client.fetch(url, params=params, raw=True)
+    if first is None:
+        return None
+
+    if parser is not None:
+        lang = (params or {}).get("lang")
+        page_count = await parser.extract("page_count", first, lang=lang)
+    else:
+        page_count = extract_page_count(first)
+    page_count = min(page_count, MAX_PAGES)
+
+    rest = await asyncio.gather(
+        *[
+            client.fetch(url, params={**(params or {}), PAGE_PARAM: page}, raw=True)
+            for page in range(2, page_count + 1)
+        ]
+    )
+    return [first] + [page for page in rest if page is not None]
+
+
+async def fetch_poem(client, parser, url, langs):
+    """Fetch and extract the ``langs`` texts of one ghazal or nazm.
+
+    Each page language is fetched once for all the variants it carries
+    (see plan_fetches). Returns {lang: text} for the languages that came
+    back; missing ones are left out, for the caller to retry or record.
+    """
+
+    async def fetch_page(page_lang, variants):
+        html = await client.fetch(url, params={"lang": page_lang}, raw=True)
+        if html is None:
+            return {}
+        return await parser.extract("poem", html, variants, lang=page_lang)
+
+    fetched = await asyncio.gather(
+        *[
+            fetch_page(page_lang, variants)
+            for page_lang, variants in plan_fetches(langs).items()
+        ]
+    )
+    return {lang: text for poems in fetched for lang, text in poems.items()}
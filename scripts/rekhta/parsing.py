@@ -0,0 +1,54 @@
+import os
+import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from .extract import get_extractor
+from .metrics import METRICS
+
+
+def timed(func, *args):
+    # Runs in the worker, so the time excludes queueing and pickling
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+class ParsePool:
+    """Runs extractors in worker processes so the event loop keeps fetching.
+
+    ``workers=0`` parses inline on the event loop, which is handy for
+    debugging and for tiny runs where process start-up dominates.
+    ``backend`` picks the extractor implementation ("bs4" or "lxml"),
+    defaulting to the REKHTA_PARSER environment variable. Time spent in
+    each extractor is recorded as ``parse_seconds`` in METRICS, labelled by
+    ``kind`` and by the ``lang`` the page was fetched in, if given.
+    """
+
+    def __init__(self, workers=None, backend=None):
+        self.workers = os.cpu_count() if workers is None else workers
+        self.backend = backend
+        self.executor = None
+
+    def __enter__(self):
+        if self.workers:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    async def run(self, func, *args):
+        if self.executor is None:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def extract(self, kind, *args, lang=None):
+        func = get_extractor(kind, self.backend)
+        seconds, result = await self.run(timed, func, *args)
+        # "none" for pages without a language, like the fetch_* metrics
+        METRICS.observe("parse_seconds", seconds, kind=kind, lang=lang or "none")
+        return result
@@ -0,0 +1,91 @@
+import time
+import asyncio
+from email.utils import parsedate_to_datetime
+
+# Responses that mean the server wants us to slow down
+OVERLOAD_STATUSES = {429, 503}
+
+
+class AdaptiveLimiter:
+    """AIMD controller for the number of requests in flight.
+
+    Every successful response that came back fast enough (``release``
+    with a ``latency``) grows the window by ``increase / limit``, i.e. by
+    ``increase`` per window's worth of requests; failed requests are
+    released without one. A 429, 503 or timeout multiplies it by
+    ``decrease``, at most once per round trip: overload signals from
+    requests sent before the last decrease are ignored. ``pause`` holds
+    back new requests, e.g. for a Retry-After header.
+    """
+
+    def __init__(
+        self,
+        initial=8,
+        minimum=1,
+        maximum=256,
+        increase=1.0,
+        decrease=0.5,
+        target_latency=2.0,
+    ):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.target_latency = target_latency
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.condition = None
+
+    async def acquire(self):
+        if self.condition is None:
+            self.condition = asyncio.Condition()
+
+        async with self.condition:
+            while True:
+                # Checked after every wakeup, so a Retry-After that arrived
+                # while this request was queued still holds it back
+                delay = self.paused_until - time.monotonic()
+                if delay > 0:
+                    self.condition.release()
+                    try:
+                        await asyncio.sleep(delay)
+                    finally:
+                        await self.condition.acquire()
+                    continue
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return time.monotonic()
+                await self.condition.wait()
+
+    async def release(self, started, latency=None, overloaded=False):
+        async with self.condition:
+            self.in_flight -= 1
+            if overloaded:
+                if started >= self.last_decrease:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self.last_decrease = time.monotonic()
+            elif latency is not None and latency <= self.target_latency:
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            # Wake only as many waiters as there are free slots
+            free = int(self.limit) - self.in_flight
+            if free > 0:
+                self.condition.notify(free)
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
@@ -0,0 +1,59 @@
+from urllib.parse import urlparse
+
+from .alignment import zip_shers
+from .cache import PageCache
+from .extract import LANG_PAGES, PAGE_PARAM, get_extractor
+
+FORMS = ("ghazals", "nazms", "shers")
+
+
+def classify_page(url):
+    """Return (form, key) for a cached page, or (None, None) if not a text page.
+
+    Poem pages are keyed by their URL, couplet pages by the poet URL.
+    """
+    parts = urlparse(url).path.strip("/").split("/")
+    if len(parts) == 2 and parts[0] in ("ghazals", "nazms"):
+        return parts[0], url
+    if len(parts) == 3 and parts[0] == "poets" and parts[2] == "couplets":
+        return "shers", url[: -len("/couplets")]
+    return None, None
+
+
+def page_variants(page_lang):
+    return [lang for lang, page in LANG_PAGES.items() if page == page_lang]
+
+
+def extract_cached_page(job):
+    cache_dir, entry, backend = job
+    form, key = classify_page(entry["url"])
+    variants = page_variants(entry["params"].get("lang"))
+    html = PageCache(cache_dir).read(entry)
+
+    page = int(entry["params"].get(PAGE_PARAM, 1))
+
+    kind = "shers" if form == "shers" else "poem"
+    return form, key, page, get_extractor(kind, backend)(html, variants), len(html)
+
+
+def iter_jobs(cache, backend=None):
+    for entry in cache.entries():
+        form, _ = classify_page(entry["url"])
+        if form is not None and entry["params"].get("lang") in LANG_PAGES:
+            yield cache.cache_dir, entry, backend
+
+
+def collect_shers(sher_pages):
+    """Zip per-page, per-language sher lists into the dump's per-sher dicts.
+
+    Returns (shers, counts) as zip_shers does, or (None, None) when a
+    language is missing altogether.
+    """
+    poet_shers = {}
+    for page in sorted(sher_pages):
+        for lang, shers in sher_pages[page].items():
+            poet_shers.setdefault(lang, []).extend(shers)
+
+    if sorted(poet_shers) != sorted(LANG_PAGES):
+        return None, None
+    return zip_shers(poet_shers)
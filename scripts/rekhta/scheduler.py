@@ -0,0 +1,46 @@
+import asyncio
+
+
+def start_workers(queue, handle, num_workers=50, progress=None):
+    """Start ``num_workers`` tasks that pass every item of ``queue`` to ``handle``.
+
+    Errors are reported and the item dropped, so one bad page does not
+    stop a worker. Wait on ``queue.join()`` and then ``stop_workers``.
+    """
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            try:
+                await handle(item)
+            except Exception as e:
+                print(f"Error processing {item}: {str(e)}")
+            finally:
+                queue.task_done()
+                if progress is not None:
+                    progress.update(1)
+
+    return [asyncio.create_task(worker()) for _ in range(num_workers)]
+
+
+async def stop_workers(workers):
+    for task in workers:
+        task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def run_workers(items, handle, num_workers=50, progress=None):
+    """Drain ``items`` through ``handle`` with ``num_workers`` concurrent workers.
+
+    Every item is an independent unit of work, so a poet with hundreds of
+    poems is spread over all workers instead of being walked by one.
+    """
+    queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+
+    workers = start_workers(queue, handle, num_workers, progress)
+    try:
+        await queue.join()
+    finally:
+        await stop_workers(workers)
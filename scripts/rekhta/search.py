@@ -0,0 +1,135 @@
+import os
+import sqlite3
+import hashlib
+
+from .corpus import iter_couplets
+from .normalize import normalize_text, tokenize
+
+# Full-text index over the dumps, in SQLite. Every sher is one document per
+# language: shers from the sher dump as they are, ghazals and nazms split
+# into their couplets (see corpus.iter_couplets). ``docs``
+# keeps the original text and where it came from, the FTS5 table ``terms``
+# holds the normalized text under the same rowid. Text is normalized in
+# Python, so FTS only has to split on spaces ("ascii" tokenizer).
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    form TEXT NOT NULL,
+    poet TEXT NOT NULL,
+    url TEXT,
+    sher INTEGER NOT NULL,
+    lang TEXT NOT NULL,
+    text TEXT NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_form ON docs (form);
+CREATE VIRTUAL TABLE IF NOT EXISTS terms USING fts5 (body, tokenize = "ascii");
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    form TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+"""
+
+
+def open_index(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def iter_docs(form, dump):
+    for row in iter_couplets(form, dump):
+        key = f"{form}|{row['url'] or row['poet']}|{row['sher']}|{row['lang']}"
+        yield key, row["poet"], row["url"], row["sher"], row["lang"], row["text"]
+
+
+def digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def source_unchanged(conn, path, form):
+    stat = os.stat(path)
+    row = conn.execute(
+        "SELECT mtime, size FROM sources WHERE path = ? AND form = ?", (path, form)
+    ).fetchone()
+    return row is not None and (row["mtime"], row["size"]) == (
+        stat.st_mtime,
+        stat.st_size,
+    )
+
+
+def index_dump(conn, form, dump):
+    """Bring the documents of ``form`` in line with ``dump``.
+
+    Only new or changed shers are (re)indexed, and shers no longer in the
+    dump are dropped. Returns (added, updated, removed).
+    """
+    rows = conn.execute("SELECT id, key, digest FROM docs WHERE form = ?", (form,))
+    known = {row["key"]: (row["id"], row["digest"]) for row in rows}
+    added, updated = 0, 0
+    with conn:
+        for key, poet, url, sher, lang, text in iter_docs(form, dump):
+            text_digest = digest(text)
+            doc_id, known_digest = known.pop(key, (None, None))
+            if known_digest == text_digest:
+                continue
+            if doc_id is None:
+                doc_id = conn.execute(
+                    "INSERT INTO docs (key, form, poet, url, sher, lang, text, digest)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, form, poet, url, sher, lang, text, text_digest),
+                ).lastrowid
+                added += 1
+            else:
+                conn.execute(
+                    "UPDATE docs SET text = ?, digest = ? WHERE id = ?",
+                    (text, text_digest, doc_id),
+                )
+                conn.execute("DELETE FROM terms WHERE rowid = ?", (doc_id,))
+                updated += 1
+            conn.execute(
+                "INSERT INTO terms (rowid, body) VALUES (?, ?)",
+                (doc_id, normalize_text(text)),
+            )
+
+        removed = [(doc_id,) for doc_id, _ in known.values()]
+        conn.executemany("DELETE FROM terms WHERE rowid = ?", removed)
+        conn.executemany("DELETE FROM docs WHERE id = ?", removed)
+    return added, updated, len(removed)
+
+
+def record_source(conn, path, form):
+    stat = os.stat(path)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO sources (path, form, mtime, size)"
+            " VALUES (?, ?, ?, ?)",
+            (path, form, stat.st_mtime, stat.st_size),
+        )
+
+
+def search(conn, query, lang=None, form=None, poet=None, limit=20):
+    """Return the shers containing every word of ``query``, best first."""
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    match = " ".join('"' + token.replace('"', '""') + '"' for token in tokens)
+
+    sql = (
+        "SELECT docs.* FROM terms JOIN docs ON docs.id = terms.rowid"
+        " WHERE terms MATCH ?"
+    )
+    params = [match]
+    for column, value in (("lang", lang), ("form", form), ("poet", poet)):
+        if value is not None:
+            sql += f" AND docs.{column} = ?"
+            params.append(value)
+    sql += " ORDER BY terms.rank LIMIT ?"
+    params.append(limit)
+    return [dict(row) for row in conn.execute(sql, params)]
@@ -0,0 +1,168 @@
+import os
+import json
+import struct
+import hashlib
+from array import array
+from bisect import bisect_left
+
+# What a resumed scraper has already fetched, without loading the dumps.
+# Dumps are read one top-level entry (one poet) at a time, and only an
+# 8-byte hash of each completed key, e.g. (url, lang), is kept, in sorted
+# arrays searched by bisection. The hashes of a dump are cached next to it
+# in "<dump>.seen", so later runs skip even the streaming pass until the
+# dump changes.
+
+READ_SIZE = 1 << 20
+# dump size, dump mtime_ns, number of hashes
+SIDECAR_HEADER = struct.Struct("<QQQ")
+
+_decoder = json.JSONDecoder()
+
+
+def iter_items(dump_file, read_size=READ_SIZE):
+    """Yield the (key, value) pairs of a JSON object file one at a time."""
+    if not os.path.exists(dump_file):
+        return
+    with open(dump_file, encoding="utf-8") as f:
+        buffer, pos = f.read(read_size), 0
+        eof = False
+
+        def skip(chars):
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    break
+                refill()
+            if pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+                return buffer[pos - 1]
+            return None
+
+        def refill(size=read_size):
+            nonlocal buffer, pos, eof
+            chunk = f.read(size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+
+        def decode():
+            nonlocal pos
+            skip("")
+            while True:
+                try:
+                    value, end = _decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    # The value runs past the buffer; read as much again
+                    refill(max(read_size, len(buffer)))
+                    continue
+                if end == len(buffer) and not eof:
+                    # A number may continue in the next chunk
+                    refill()
+                    continue
+                pos = end
+                return value
+
+        if skip("{") is None:
+            raise ValueError(f"{dump_file} does not hold a JSON object")
+        if skip("}"):
+            return
+        while True:
+            key = decode()
+            skip(":")
+            yield key, decode()
+            if skip(",}") != ",":
+                return
+
+
+def key_hash(*parts):
+    data = "\t".join(parts).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def sorted_hashes(keys):
+    hashes = array("Q", (key_hash(*key) for key in keys))
+    return array("Q", sorted(hashes))
+
+
+class SeenIndex:
+    """Set membership for key tuples at 8 bytes per key.
+
+    Made of sorted runs of 64-bit key hashes; a false positive needs a hash
+    collision, which is vanishingly rare at corpus sizes.
+    """
+
+    def __init__(self, runs=()):
+        self.runs = [run for run in runs if len(run)]
+
+    def __contains__(self, key):
+        h = key_hash(*key)
+        for run in self.runs:
+            i = bisect_left(run, h)
+            if i < len(run) and run[i] == h:
+                return True
+        return False
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+
+def poem_keys(poet, poems):
+    # {url: {lang: text}} -> (url, lang) for every text that was fetched
+    for url, texts in poems.items():
+        for lang, text in texts.items():
+            if text is not None:
+                yield url, lang
+
+
+def poet_keys(poet, value):
+    yield (poet,)
+
+
+def read_sidecar(sidecar_file, stat):
+    if not os.path.exists(sidecar_file):
+        return None
+    with open(sidecar_file, "rb") as f:
+        header = f.read(SIDECAR_HEADER.size)
+        if len(header) < SIDECAR_HEADER.size:
+            return None
+        size, mtime_ns, count = SIDECAR_HEADER.unpack(header)
+        if (size, mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        hashes = array("Q")
+        try:
+            hashes.fromfile(f, count)
+        except EOFError:
+            return None
+    return hashes
+
+
+def write_sidecar(sidecar_file, stat, hashes):
+    tmp_path = sidecar_file + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(SIDECAR_HEADER.pack(stat.st_size, stat.st_mtime_ns, len(hashes)))
+        hashes.tofile(f)
+    os.replace(tmp_path, sidecar_file)
+
+
+def load_seen(dump_file, dump_keys=poem_keys, extra_keys=()):
+    """SeenIndex of the keys in ``dump_file`` plus ``extra_keys``.
+
+    ``dump_keys(key, value)`` lists the keys of one top-level dump entry;
+    ``extra_keys`` is typically what a journal adds on top of the dump.
+    """
+    runs = []
+    if os.path.exists(dump_file):
+        sidecar_file = dump_file + ".seen"
+        stat = os.stat(dump_file)
+        hashes = read_sidecar(sidecar_file, stat)
+        if hashes is None:
+            hashes = sorted_hashes(
+                key for entry in iter_items(dump_file) for key in dump_keys(*entry)
+            )
+            write_sidecar(sidecar_file, stat, hashes)
+        runs.append(hashes)
+    runs.append(sorted_hashes(extra_keys))
+    return SeenIndex(runs)
@@ -0,0 +1,321 @@
+import time
+import sqlite3
+
+from .extract import LANGS
+
+# Crawl state in SQLite: poets, the poem URLs listed for each poet, every
+# fetched text per language, shers, and the status of failed fetches.
+# Writes are buffered and committed in batches, so a checkpoint only costs
+# the rows that changed, and resuming is a primary key lookup instead of
+# loading every dump. Only run_pipeline.py crawls into it; the per-stage
+# scrapers keep their JSON dumps and journals, which remain the files
+# everything downstream reads, and crawl_state.py moves data between the
+# two (import_*/export_*).
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS poets (
+    href TEXT PRIMARY KEY,
+    name TEXT,
+    location TEXT,
+    active_years TEXT,
+    description TEXT
+);
+CREATE TABLE IF NOT EXISTS poems (
+    url TEXT PRIMARY KEY,
+    poet TEXT NOT NULL,
+    form TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS poems_poet ON poems (poet, form, position);
+-- Which poem lists (and sher pages, as form "shers") have been fetched, so
+-- poets with nothing on them are not fetched again
+CREATE TABLE IF NOT EXISTS poem_lists (
+    poet TEXT NOT NULL,
+    form TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (poet, form)
+);
+CREATE TABLE IF NOT EXISTS texts (
+    url TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    text TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (url, lang)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS shers (
+    poet TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    lang TEXT NOT NULL,
+    text TEXT,
+    PRIMARY KEY (poet, position, lang)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS fetches (
+    url TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (url, lang)
+) WITHOUT ROWID;
+-- Bookkeeping, e.g. which version of each JSON dump was last imported
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+POET_FIELDS = ["name", "href", "location", "active_years", "description"]
+SHER_LANGS = ["hi", "en", "en-rm", "ur"]
+
+UPSERT_POET = """
+INSERT INTO poets (href, name, location, active_years, description)
+VALUES (:href, :name, :location, :active_years, :description)
+ON CONFLICT (href) DO UPDATE SET
+    name = excluded.name,
+    location = excluded.location,
+    active_years = excluded.active_years,
+    description = excluded.description
+"""
+UPSERT_POEM = """
+INSERT INTO poems (url, poet, form, position) VALUES (?, ?, ?, ?)
+ON CONFLICT (url) DO UPDATE SET
+    poet = excluded.poet, form = excluded.form, position = excluded.position
+"""
+UPSERT_LIST = """
+INSERT INTO poem_lists (poet, form, fetched_at) VALUES (?, ?, ?)
+ON CONFLICT (poet, form) DO UPDATE SET fetched_at = excluded.fetched_at
+"""
+UPSERT_TEXT = """
+INSERT OR REPLACE INTO texts (url, lang, text, fetched_at) VALUES (?, ?, ?, ?)
+"""
+CLEAR_FETCH = "DELETE FROM fetches WHERE url = ? AND lang = ?"
+UPSERT_SHER = """
+INSERT OR REPLACE INTO shers (poet, position, lang, text) VALUES (?, ?, ?, ?)
+"""
+CLEAR_SHERS = "DELETE FROM shers WHERE poet = ?"
+UPSERT_META = "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)"
+FAIL_FETCH = """
+INSERT INTO fetches (url, lang, status, attempts, updated_at)
+VALUES (?, ?, 'failed', 1, ?)
+ON CONFLICT (url, lang) DO UPDATE SET
+    attempts = attempts + 1, updated_at = excluded.updated_at
+"""
+
+
+class CrawlState:
+    """SQLite (WAL) crawl state with batched writes.
+
+    Writes from the scrapers are queued in memory and committed together,
+    in one transaction, once ``batch_size`` rows are waiting or
+    ``flush_interval`` seconds have passed; ``close`` commits the rest.
+    Reads only see committed rows.
+    """
+
+    def __init__(self, path, batch_size=500, flush_interval=5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Statements in the order they were queued, each with its rows
+        self.pending = []
+        self.pending_rows = 0
+        self.last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def queue(self, sql, rows):
+        if self.pending and self.pending[-1][0] == sql:
+            self.pending[-1][1].extend(rows)
+        else:
+            self.pending.append((sql, list(rows)))
+        self.pending_rows += len(rows)
+        if (
+            self.pending_rows >= self.batch_size
+            or time.monotonic() - self.last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            with self.conn:
+                for sql, rows in self.pending:
+                    self.conn.executemany(sql, rows)
+            self.pending = []
+            self.pending_rows = 0
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def is_empty(self):
+        tables = ("poets", "poems", "texts", "shers")
+        return not any(
+            self.conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone()
+            for table in tables
+        )
+
+    # Writes
+
+    def add_poets(self, poets):
+        rows = [{field: poet.get(field) for field in POET_FIELDS} for poet in poets]
+        self.queue(UPSERT_POET, rows)
+
+    def set_poem_list(self, poet, form, urls):
+        self.queue(UPSERT_LIST, [(poet, form, time.time())])
+        self.queue(UPSERT_POEM, [(url, poet, form, i) for i, url in enumerate(urls)])
+
+    def add_texts(self, url, texts):
+        now = time.time()
+        rows = [(url, lang, text, now) for lang, text in texts.items()]
+        self.queue(UPSERT_TEXT, rows)
+        self.queue(CLEAR_FETCH, [(url, lang) for lang in texts])
+
+    def mark_failed(self, url, langs):
+        now = time.time()
+        self.queue(FAIL_FETCH, [(url, lang, now) for lang in langs])
+
+    def set_shers(self, poet, shers):
+        self.queue(UPSERT_LIST, [(poet, "shers", time.time())])
+        self.queue(CLEAR_SHERS, [(poet,)])
+        self.queue(
+            UPSERT_SHER,
+            [
+                (poet, i, lang, text)
+                for i, sher in enumerate(shers)
+                for lang, text in sher.items()
+            ],
+        )
+
+    def set_meta(self, key, value):
+        self.queue(UPSERT_META, [(key, value)])
+
+    # Resume queries
+
+    def get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,))
+        row = row.fetchone()
+        return None if row is None else row[0]
+
+    def poet_hrefs(self):
+        return [href for (href,) in self.conn.execute("SELECT href FROM poets")]
+
+    def fetched_langs(self, url):
+        rows = self.conn.execute("SELECT lang FROM texts WHERE url = ?", (url,))
+        return {lang for (lang,) in rows}
+
+    def missing_langs(self, url, langs=LANGS):
+        fetched = self.fetched_langs(url)
+        return [lang for lang in langs if lang not in fetched]
+
+    def has_poem_list(self, poet, form):
+        sql = "SELECT 1 FROM poem_lists WHERE poet = ? AND form = ?"
+        return self.conn.execute(sql, (poet, form)).fetchone() is not None
+
+    def poem_urls(self, poet, form):
+        rows = self.conn.execute(
+            "SELECT url FROM poems WHERE poet = ? AND form = ? ORDER BY position",
+            (poet, form),
+        )
+        return [url for (url,) in rows]
+
+    def counts(self):
+        counts = {}
+        for table in ("poets", "poems", "texts", "shers"):
+            sql = f"SELECT COUNT(*) FROM {table}"
+            counts[table] = self.conn.execute(sql).fetchone()[0]
+        counts["failed"] = self.conn.execute(
+            "SELECT COUNT(*) FROM fetches WHERE status = 'failed'"
+        ).fetchone()[0]
+        return counts
+
+    # Exports in the JSON dump formats
+
+    def export_poets(self):
+        columns = ", ".join(POET_FIELDS)
+        rows = self.conn.execute(f"SELECT {columns} FROM poets ORDER BY rowid")
+        return [dict(zip(POET_FIELDS, row)) for row in rows]
+
+    def export_poems_list(self, forms=("ghazals", "nazms")):
+        poems_list = {}
+        rows = self.conn.execute(
+            "SELECT poet, form FROM poem_lists WHERE form != 'shers' ORDER BY rowid"
+        )
+        for poet, form in rows:
+            poems_list.setdefault(poet, {f: [] for f in forms}).setdefault(form, [])
+        rows = self.conn.execute(
+            "SELECT poet, form, url FROM poems ORDER BY poet, form, position"
+        )
+        for poet, form, url in rows:
+            if poet in poems_list:
+                poems_list[poet].setdefault(form, []).append(url)
+        return poems_list
+
+    def export_poems(self, form):
+        dump = {}
+        rows = self.conn.execute(
+            "SELECT poems.poet, poems.url, texts.lang, texts.text FROM poems"
+            " JOIN texts ON texts.url = poems.url WHERE poems.form = ?"
+            " ORDER BY poems.poet, poems.position",
+            (form,),
+        )
+        for poet, url, lang, text in rows:
+            dump.setdefault(poet, {}).setdefault(url, {})[lang] = text
+        for poems in dump.values():
+            for url, texts in poems.items():
+                poems[url] = {lang: texts[lang] for lang in LANGS if lang in texts}
+        return dump
+
+    def export_shers(self):
+        rows = self.conn.execute(
+            "SELECT poet FROM poem_lists WHERE form = 'shers' ORDER BY rowid"
+        )
+        dump = {poet: [] for (poet,) in rows}
+        rows = self.conn.execute(
+            "SELECT poet, position, lang, text FROM shers ORDER BY poet, position"
+        )
+        for poet, position, lang, text in rows:
+            shers = dump.setdefault(poet, [])
+            while len(shers) <= position:
+                shers.append({})
+            shers[position][lang] = text
+        for shers in dump.values():
+            for i, sher in enumerate(shers):
+                shers[i] = {lang: sher.get(lang) for lang in SHER_LANGS}
+        return dump
+
+    # Imports from the JSON dump formats
+
+    def import_poets(self, poets):
+        self.add_poets(poets)
+
+    def import_poems_list(self, poems_list):
+        for poet, details in poems_list.items():
+            for form, urls in details.items():
+                self.set_poem_list(poet, form, urls)
+
+    def import_poems(self, form, dump):
+        for poet, poems in dump.items():
+            known = self.conn.execute(
+                "SELECT COUNT(*) FROM poems WHERE poet = ? AND form = ?", (poet, form)
+            ).fetchone()[0]
+            # Poems missing from the poems list go after the listed ones
+            self.queue(
+                "INSERT OR IGNORE INTO poems (url, poet, form, position)"
+                " VALUES (?, ?, ?, ?)",
+                [(url, poet, form, known + i) for i, url in enumerate(poems)],
+            )
+            for url, texts in poems.items():
+                texts = {lang: t for lang, t in texts.items() if t is not None}
+                self.add_texts(url, texts)
+
+    def import_shers(self, dump):
+        for poet, shers in dump.items():
+            self.set_shers(poet, shers)
@@ -0,0 +1,190 @@
+import os
+import json
+import mmap
+import shutil
+import struct
+
+from .corpus import iter_rows
+
+# On-disk layout of a corpus store:
+#   texts.bin   every text, UTF-8 encoded, back to back
+#   index.bin   one fixed-size record per text (see RECORD), row id = position
+#   meta.json   the poet, url, form and lang tables the records point into
+RECORD = struct.Struct("<QIIiIBB2x")
+NO_URL = 0xFFFFFFFF
+TEXTS_FILE = "texts.bin"
+INDEX_FILE = "index.bin"
+META_FILE = "meta.json"
+
+
+class Interner:
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def __call__(self, value):
+        if value not in self.ids:
+            self.ids[value] = len(self.values)
+            self.values.append(value)
+        return self.ids[value]
+
+
+def build_store(dump_files, store_dir):
+    """Pack the dumps in ``dump_files`` (form -> path) into ``store_dir``.
+
+    The store is built next to the target and swapped in whole, so readers
+    never see a half-written store.
+    """
+    tmp_dir = store_dir.rstrip("/") + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    poets, urls, forms, langs = Interner(), Interner(), Interner(), Interner()
+    rows, offset = 0, 0
+    with open(os.path.join(tmp_dir, TEXTS_FILE), "wb") as texts, open(
+        os.path.join(tmp_dir, INDEX_FILE), "wb"
+    ) as index:
+        for form, dump_file in dump_files.items():
+            with open(dump_file, encoding="utf-8") as f:
+                dump = json.load(f)
+            for row in iter_rows(form, dump):
+                text = row["text"].encode("utf-8")
+                url_id = urls(row["url"]) if row["url"] is not None else NO_URL
+                sher = row["sher"] if row["sher"] is not None else -1
+                index.write(
+                    RECORD.pack(
+                        offset,
+                        len(text),
+                        poets(row["poet"]),
+                        sher,
+                        url_id,
+                        forms(form),
+                        langs(row["lang"]),
+                    )
+                )
+                texts.write(text)
+                offset += len(text)
+                rows += 1
+            dump = None
+
+    meta = {
+        "rows": rows,
+        "poets": poets.values,
+        "urls": urls.values,
+        "forms": forms.values,
+        "langs": langs.values,
+    }
+    with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+    return rows
+
+
+def map_file(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class CorpusStore:
+    """Read-only, memory-mapped view of a store written by build_store.
+
+    Texts and index are mapped rather than read, so any number of loader
+    processes opening the same store share one copy in the page cache.
+    ``store[i]`` returns row ``i`` in O(1); ``iter_ids``/``iter_rows`` walk
+    the rows matching poet/lang/form filters, optionally only one of
+    ``num_shards`` deterministic shards. Pickling a store pickles just its
+    path, so it can be handed to worker processes.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.rows = meta["rows"]
+        self.poets = meta["poets"]
+        self.urls = meta["urls"]
+        self.forms = meta["forms"]
+        self.langs = meta["langs"]
+        self.texts = map_file(os.path.join(store_dir, TEXTS_FILE))
+        self.index = map_file(os.path.join(store_dir, INDEX_FILE))
+
+    def __getstate__(self):
+        return {"store_dir": self.store_dir}
+
+    def __setstate__(self, state):
+        self.__init__(state["store_dir"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for mapped in (self.texts, self.index):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+
+    def __len__(self):
+        return self.rows
+
+    def record(self, row_id):
+        if not 0 <= row_id < self.rows:
+            raise IndexError(f"row {row_id} out of range for {self.rows} rows")
+        return RECORD.unpack_from(self.index, row_id * RECORD.size)
+
+    def iter_records(self):
+        return RECORD.iter_unpack(self.index)
+
+    def text(self, row_id):
+        offset, length = self.record(row_id)[:2]
+        return self.texts[offset : offset + length].decode("utf-8")
+
+    def __getitem__(self, row_id):
+        offset, length, poet, sher, url, form, lang = self.record(row_id)
+        return {
+            "id": row_id,
+            "poet": self.poets[poet],
+            "form": self.forms[form],
+            "url": self.urls[url] if url != NO_URL else None,
+            "sher": sher if sher >= 0 else None,
+            "lang": self.langs[lang],
+            "text": self.texts[offset : offset + length].decode("utf-8"),
+        }
+
+    def iter_ids(self, poet=None, lang=None, form=None, shard=0, num_shards=1):
+        if not 0 <= shard < num_shards:
+            raise ValueError(f"shard {shard} out of range for {num_shards} shards")
+        wanted = [
+            (2, lookup_ids(self.poets, poet)),
+            (5, lookup_ids(self.forms, form)),
+            (6, lookup_ids(self.langs, lang)),
+        ]
+        wanted = [(field, ids) for field, ids in wanted if ids is not None]
+
+        matched = 0
+        for row_id, record in enumerate(self.iter_records()):
+            if all(record[field] in ids for field, ids in wanted):
+                # Round-robin over the matching rows, so every shard gets an
+                # even share whatever the filters, the same on every run
+                if matched % num_shards == shard:
+                    yield row_id
+                matched += 1
+
+    def iter_rows(self, **filters):
+        for row_id in self.iter_ids(**filters):
+            yield self[row_id]
+
+
+def lookup_ids(values, wanted):
+    # Accepts one value or several; unknown values simply match nothing
+    if wanted is None:
+        return None
+    if isinstance(wanted, str):
+        wanted = [wanted]
+    ids = {value: i for i, value in enumerate(values)}
+    return {ids[value] for value in wanted if value in ids}
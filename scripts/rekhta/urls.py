@@ -0,0 +1,30 @@
+import os
+from urllib.parse import urlencode, urljoin, urlsplit, urlunsplit
+
+# Overridable so the scrapers can be pointed at a mirror or at the local
+# mock server used by scripts/benchmark.py
+BASE_URL = os.environ.get("REKHTA_BASE_URL", "https://www.rekhta.org")
+
+
+def canonical_url(href, base=None, keep_query=False):
+    """One spelling per page: absolute, lowercase host, no trailing slash.
+
+    Relative hrefs are resolved against ``base`` (BASE_URL by default).
+    Fragments are always dropped and so are query strings, unless
+    ``keep_query``, since the site's pages take their language as a
+    request parameter rather than as part of the link.
+    """
+    base = (base or BASE_URL).rstrip("/") + "/"
+    scheme, netloc, path, query, _ = urlsplit(urljoin(base, href.strip()))
+    path = path.rstrip("/") or "/"
+    return urlunsplit(
+        (scheme.lower(), netloc.lower(), path, query if keep_query else "", "")
+    )
+
+
+def request_key(url, params=None):
+    # Same key for every spelling of the same request
+    key = canonical_url(url, keep_query=True)
+    if params:
+        key += ("&" if "?" in key else "?") + urlencode(sorted(params.items()))
+    return key
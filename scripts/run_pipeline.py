@@ -0,0 +1,177 @@
+import os
+import asyncio
+import argparse
+from tqdm import tqdm
+from rekhta import (
+    BASE_URL,
+    LANGS,
+    ParsePool,
+    RekhtaClient,
+    fetch_pages,
+    fetch_poem,
+    report_metrics,
+    start_workers,
+    stop_workers,
+)
+from rekhta.state import CrawlState
+from rekhta.corpus import POEM_FORMS
+from crawl_state import STATE_FILE, export_dumps, import_dumps
+from scrape_poets import LETTERS
+
+# All of poets -> poem lists -> ghazal/nazm texts in one process, with no
+# barrier between stages: every poet found in the directory is queued for
+# its ghazal and nazm lists straight away, and every poem URL on those lists
+# is queued for its text. The queues are bounded, so a fast stage waits for
+# the next one instead of piling up work in memory. Progress is kept in the
+# SQLite crawl state (see crawl_state.py). Before each run the state picks
+# up whichever JSON dumps the per-stage scrapers have written since, and at
+# the end it exports the dumps this pipeline crawls (poets, poem lists,
+# ghazals, nazms), so the files of scrape_poets.py,
+# scrape_poems_list_async.py, scrape_ghazals_optimized.py and scrape_nazms.py
+# stay in step with it. The shers dump is left alone.
+# A resumed run does not crawl the poet directory or poem lists again once
+# the state has them; --refresh crawls them anew for new poets and poems.
+
+LIST_WORKERS = 16
+POEM_WORKERS = 100
+POETS_QUEUE_SIZE = 64
+POEMS_QUEUE_SIZE = 1000
+PARSE_WORKERS = os.cpu_count()
+PIPELINE_DUMPS = ["poets", "poems_list", *POEM_FORMS]
+
+
+class Pipeline:
+    def __init__(self, client, parser, state, progress, refresh=False):
+        self.client = client
+        self.parser = parser
+        self.state = state
+        self.progress = progress
+        self.refresh = refresh
+        self.poets_queue = asyncio.Queue(POETS_QUEUE_SIZE)
+        self.poems_queue = asyncio.Queue(POEMS_QUEUE_SIZE)
+        self.poets = set()
+        self.poems = 0
+
+    async def discover_poets(self):
+        url = os.path.join(BASE_URL, "poets")
+
+        async def crawl_letter(letter):
+            pages = await fetch_pages(
+                self.client, url, params={"startswith": letter}, parser=self.parser
+            )
+            if pages is None:
+                return False
+            for html in pages:
+                for poet in await self.parser.extract("poets", html):
+                    # startswith is case-insensitive, so each poet shows up twice
+                    if poet["href"] not in self.poets:
+                        self.poets.add(poet["href"])
+                        self.state.add_poets([poet])
+                        await self.poets_queue.put(poet["href"])
+            return True
+
+        if not self.refresh and self.state.get_meta("poets_discovered"):
+            for poet_url in self.state.poet_hrefs():
+                self.poets.add(poet_url)
+                await self.poets_queue.put(poet_url)
+            return
+        crawled = await asyncio.gather(*[crawl_letter(letter) for letter in LETTERS])
+        # A letter that could not be fetched is crawled again next run
+        if all(crawled):
+            self.state.set_meta("poets_discovered", "1")
+
+    async def fetch_poem_list(self, poet_url):
+        details = {}
+        for form in POEM_FORMS:
+            if not self.refresh and self.state.has_poem_list(poet_url, form):
+                details[form] = self.state.poem_urls(poet_url, form)
+                continue
+            pages = await fetch_pages(
+                self.client, f"{poet_url}/{form}", parser=self.parser
+            )
+            if pages is None:
+                # Left unlisted, so the next run fetches it again
+                continue
+            page_links = await asyncio.gather(
+                *[self.parser.extract("links", html) for html in pages]
+            )
+            links = [link for links in page_links for link in links]
+            details[form] = list(dict.fromkeys(links))
+            self.state.set_poem_list(poet_url, form, details[form])
+
+        for form, urls in details.items():
+            for url in urls:
+                missing = self.state.missing_langs(url, LANGS)
+                if missing:
+                    self.progress.total += 1
+                    self.progress.refresh()
+                    # Blocks while the poem fetchers are behind
+                    await self.poems_queue.put((url, missing))
+
+    async def fetch_poem(self, item):
+        url, missing = item
+        texts = await fetch_poem(self.client, self.parser, url, missing)
+        self.state.add_texts(url, texts)
+        failed = [lang for lang in missing if lang not in texts]
+        if failed:
+            self.state.mark_failed(url, failed)
+        self.poems += 1
+
+    async def run(self):
+        list_workers = start_workers(
+            self.poets_queue, self.fetch_poem_list, LIST_WORKERS
+        )
+        poem_workers = start_workers(
+            self.poems_queue, self.fetch_poem, POEM_WORKERS, self.progress
+        )
+        try:
+            await self.discover_poets()
+            await self.poets_queue.join()
+            await self.poems_queue.join()
+        finally:
+            await stop_workers(list_workers + poem_workers)
+
+
+async def run_pipeline(refresh=False):
+    state = CrawlState(STATE_FILE)
+    # Pick up what the per-stage scrapers wrote since the last run, so the
+    # export at the end does not overwrite it
+    imported = import_dumps(state, PIPELINE_DUMPS, changed_only=True)
+    if imported:
+        print(f"Imported {', '.join(imported)} into {STATE_FILE}")
+
+    pipeline = None
+    try:
+        with ParsePool(PARSE_WORKERS) as parser:
+            async with RekhtaClient() as client:
+                with tqdm(total=0, unit=" poems") as progress:
+                    pipeline = Pipeline(client, parser, state, progress, refresh)
+                    await pipeline.run()
+    finally:
+        state.flush()
+        export_dumps(state, PIPELINE_DUMPS)
+        counts = state.counts()
+        state.close()
+
+    print(
+        f"{len(pipeline.poets)} poets, fetched {pipeline.poems} poems; state has "
+        + ", ".join(f"{count} {name}" for name, count in counts.items())
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Crawl poets, poem lists and poems in one streaming pipeline"
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="crawl the poet directory and poem lists again, not just new ones",
+    )
+    args = parser.parse_args()
+    async with report_metrics("pipeline"):
+        await run_pipeline(args.refresh)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
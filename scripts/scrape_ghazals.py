@@ -1,66 +1,29 @@
 import os
 import json
 import asyncio
-import aiohttp
 import random
-from bs4 import BeautifulSoup
 from tqdm import tqdm
+from rekhta import LANGS, ParsePool, RekhtaClient, plan_fetches, report_metrics
 
 IN_FILE = "data/rekhta_all_poets_poems_list.json"
 OUT_FILE = "data/rekhta_all_poets_ghazals.json"
+PARSE_WORKERS = os.cpu_count()
 
 
-def scrape_lines(poem_div):
-    lines = []
-    sections = poem_div.find_all("div", class_="w")
-    for section in sections:
-        poem_lines = section.find_all("p")
-        for poem_line in poem_lines:
-            lines.append(poem_line.text)
-        lines.append("")
-    poem = "\n".join(lines)
-    poem = poem.strip().strip("\n")
-    return poem
-
-
-async def get_ghazal(session, ghazal_url, lang="hi", romanized=False):
-    async with session.get(ghazal_url, params={"lang": lang}) as response:
-        text = await response.text()
-        soup = BeautifulSoup(text, "html.parser")
-
-        ghazal_section = soup.find("div", {"class": "mainPageWrap NewPoem"})
-        if ghazal_section is None:
-            ghazal_section = soup.find("div", {"class": "rfGhazal"})
-
-        if ghazal_section is None:
-            print(ghazal_url, lang, romanized)
-        return None
-
-        if lang != "en":
-            poem_divs = ghazal_section.find("div", {"class": "pMC", "data-roman": "on"})
-            if poem_divs is None:
-                poem_divs = ghazal_section.find(
-                    "div", {"class": "pMC", "data-roman": "off"}
-                )
-        else:
-            if romanized:
-                poem_divs = ghazal_section.find(
-                    "div", {"class": "pMC", "data-roman": "on"}
-                )
-            else:
-                poem_divs = ghazal_section.find(
-                    "div", {"class": "pMC", "data-roman": "off"}
-                )
-
-        for div in poem_divs.find_all("div", {"class": "t"}):
-            div.decompose()
-
-        poem = scrape_lines(poem_divs)
-        return poem
+async def get_ghazal(client, parser, ghazal_url, lang="hi", variants=None):
+    variants = variants or [lang]
+    html = await client.fetch(ghazal_url, params={"lang": lang}, raw=True)
+    if html is None:
+        return {}
+
+    ghazals = await parser.extract("poem", html, variants, lang=lang)
+    if not ghazals:
+        print(ghazal_url, lang, variants)
+    return ghazals
 
 
 async def fetch_ghazals_for_poet(
-    session, poet, ghazals, ghazals_dump, ghazals_dump_file, overall_progress
+    client, parser, poet, ghazals, ghazals_dump, ghazals_dump_file, overall_progress
 ):
     if poet not in ghazals_dump:
         ghazals_dump[poet] = {}
@@ -71,13 +34,11 @@ async def fetch_ghazals_for_poet(
             continue
 
         ghazal_langs = {}
-        for lang in ["en-rm", "en", "hi", "ur"]:
-            romanized = "rm" in lang
-            ghazal = await get_ghazal(
-                session, ghazal_url, lang=lang, romanized=romanized
+        for page_lang, variants in plan_fetches(LANGS).items():
+            fetched = await get_ghazal(
+                client, parser, ghazal_url, lang=page_lang, variants=variants
             )
-            if is not None:
-                ghazal_langs[lang] = ghazal
+            ghazal_langs.update(fetched)
 
         ghazals_dump[poet][ghazal_url] = ghazal_langs
 
@@ -99,24 +60,31 @@ async def scrape_ghazals_async(poets_list_file, ghazals_dump_file, poets=None):
 
     total_ghazals = sum(len(poets[poet]["ghazals"]) for poet in poets)
 
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        with tqdm(total=total_ghazals) as overall_progress:
-            for poet in poets:
-                task = fetch_ghazals_for_poet(
-                    session,
-                    poet,
-                    poets[poet]["ghazals"],
-                    ghazals_dump,
-                    ghazals_dump_file,
-                    overall_progress,
-                )
-                tasks.append(task)
-
-            await asyncio.gather(*tasks)
+    with ParsePool(PARSE_WORKERS) as parser:
+        async with RekhtaClient() as client:
+            tasks = []
+            with tqdm(total=total_ghazals) as overall_progress:
+                for poet in poets:
+                    task = fetch_ghazals_for_poet(
+                        client,
+                        parser,
+                        poet,
+                        poets[poet]["ghazals"],
+                        ghazals_dump,
+                        ghazals_dump_file,
+                        overall_progress,
+                    )
+                    tasks.append(task)
+
+                await asyncio.gather(*tasks)
 
 
 async def main():
+    async with report_metrics("ghazals"):
+        await scrape_batches()
+
+
+async def scrape_batches():
     poets_batch_size = 150
 
     if poets_batch_size:
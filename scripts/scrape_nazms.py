@@ -1,112 +1,75 @@
 import os
-import json
 import asyncio
-import aiohttp
-from bs4 import BeautifulSoup
 from tqdm import tqdm
+from rekhta import LANGS, ParsePool, RekhtaClient, plan_fetches, report_metrics
+from rekhta.journal import append_journal, compact_poems, iter_records
+from rekhta.seen import iter_items, load_seen
 
 IN_FILE = "data/rekhta_all_poets_poems_list.json"
 OUT_FILE = "data/rekhta_all_poets_nazms.json"
+JOURNAL_FILE = "data/rekhta_all_poets_nazms.journal.jsonl"
+PARSE_WORKERS = os.cpu_count()
 
 
-def scrape_lines(poem_div):
-    lines = []
-    sections = poem_div.find_all("div", class_="w")
-    for section in sections:
-        poem_lines = section.find_all("p")
-        for poem_line in poem_lines:
-            lines.append(poem_line.text)
-        lines.append("")
-    poem = "\n".join(lines)
-    poem = poem.strip().strip("\n")
-    return poem
-
-
-async def get_nazm(session, nazm_url, lang="hi", romanized=False):
-    async with session.get(nazm_url, params={"lang": lang}) as response:
-        text = await response.text()
-        soup = BeautifulSoup(text, "html.parser")
-
-        nazm_section = soup.find("div", {"class": "mainPageWrap NewPoem"})
-
-        if lang != "en":
-            poem_divs = nazm_section.find("div", {"class": "pMC", "data-roman": "on"})
-            if poem_divs is None:
-                poem_divs = nazm_section.find(
-                    "div", {"class": "pMC", "data-roman": "off"}
-                )
-        else:
-            if romanized:
-                poem_divs = nazm_section.find(
-                    "div", {"class": "pMC", "data-roman": "on"}
-                )
-            else:
-                poem_divs = nazm_section.find(
-                    "div", {"class": "pMC", "data-roman": "off"}
-                )
-
-        for div in poem_divs.find_all("div", {"class": "t"}):
-            div.decompose()
-
-        poem = scrape_lines(poem_divs)
-        return poem
+async def get_nazm(client, parser, nazm_url, lang="hi", variants=None):
+    variants = variants or [lang]
+    html = await client.fetch(nazm_url, params={"lang": lang}, raw=True)
+    if html is None:
+        return {}
+    return await parser.extract("poem", html, variants, lang=lang)
 
 
 async def fetch_nazms_for_poet(
-    session, poet, nazms, nazms_dump, nazms_dump_file, overall_progress
+    client, parser, poet, nazms, seen, journal, overall_progress
 ):
-    if poet not in nazms_dump:
-        nazms_dump[poet] = {}
-
     for nazm_url in nazms:
-        if nazm_url in nazms_dump[poet]:
-            overall_progress.update(1)  # Update progress if the nazm is already fetched
-            continue
-
-        nazm_langs = {}
-        for lang in ["en-rm", "en", "hi", "ur"]:
-            romanized = "rm" in lang
-            nazm = await get_nazm(session, nazm_url, lang=lang, romanized=romanized)
-            nazm_langs[lang] = nazm
-
-        nazms_dump[poet][nazm_url] = nazm_langs
-
-        with open(nazms_dump_file, "w") as f:
-            json.dump(nazms_dump, f, ensure_ascii=False, indent=2)
+        missing = [lang for lang in LANGS if (nazm_url, lang) not in seen]
+        for page_lang, variants in plan_fetches(missing).items():
+            fetched = await get_nazm(
+                client, parser, nazm_url, lang=page_lang, variants=variants
+            )
+            for lang, nazm in fetched.items():
+                append_journal(journal, poet, nazm_url, lang, nazm)
 
         overall_progress.update(1)
 
 
-async def scrape_nazms_async(poets_list_file, nazms_dump_file):
-    with open(poets_list_file) as f:
-        poets = json.load(f)
+async def scrape_nazms_async(poets_list_file, nazms_dump_file, journal_file):
+    poets = {poet: details["nazms"] for poet, details in iter_items(poets_list_file)}
 
-    nazms_dump = {}
-    if os.path.exists(nazms_dump_file):
-        with open(nazms_dump_file) as f:
-            nazms_dump = json.load(f)
+    # Nazms go to the journal as they arrive and are folded into the dump at
+    # the end; resuming only needs the hashes of what is already there
+    journal_keys = ((r["url"], r["lang"]) for r in iter_records(journal_file))
+    seen = load_seen(nazms_dump_file, extra_keys=journal_keys)
 
-    total_nazms = sum(len(poets[poet]["nazms"]) for poet in poets)
+    total_nazms = sum(len(nazms) for nazms in poets.values())
 
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        with tqdm(total=total_nazms) as overall_progress:
-            for poet in poets:
-                task = fetch_nazms_for_poet(
-                    session,
-                    poet,
-                    poets[poet]["nazms"],
-                    nazms_dump,
-                    nazms_dump_file,
-                    overall_progress,
-                )
-                tasks.append(task)
+    try:
+        with open(journal_file, "a", encoding="utf-8") as journal:
+            with ParsePool(PARSE_WORKERS) as parser:
+                async with RekhtaClient() as client:
+                    tasks = []
+                    with tqdm(total=total_nazms) as overall_progress:
+                        for poet, nazms in poets.items():
+                            task = fetch_nazms_for_poet(
+                                client,
+                                parser,
+                                poet,
+                                nazms,
+                                seen,
+                                journal,
+                                overall_progress,
+                            )
+                            tasks.append(task)
 
-            await asyncio.gather(*tasks)
+                        await asyncio.gather(*tasks)
+    finally:
+        compact_poems(nazms_dump_file, journal_file, poets.items())
 
 
 async def main():
-    await scrape_nazms_async(IN_FILE, OUT_FILE)
+    async with report_metrics("nazms"):
+        await scrape_nazms_async(IN_FILE, OUT_FILE, JOURNAL_FILE)
 
 
 if __name__ == "__main__":
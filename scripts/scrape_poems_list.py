@@ -1,7 +1,7 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
 from tqdm import tqdm
 import json
+from rekhta import RekhtaClient, extract_links, fetch_pages, report_metrics
 
 IN_FILE = "data/rekhta_top_poets_list.json"
 OUT_FILE = "data/rekhta_top_poets_poems_list.json"
@@ -9,40 +9,37 @@ OUT_FILE = "data/rekhta_top_poets_poems_list.json"
 links_sections = ["ghazals", "nazms"]
 
 
-def get_links(poet_url):
+async def get_links(client, poet_url):
     details = {"ghazals": [], "nazms": []}
 
     for section in links_sections:
         url = f"{poet_url}/{section}"
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        content_section = soup.find(
-            "div",
-            {
-                "class": "contentListBody contentLoadMoreSection rt_miriyaatSec rt_manageColumn"
-            },
-        )
-        links = content_section.find_all("a") if content_section is not None else []
-
-        for link in links:
-            if link.get("href") and not "//" in link["href"].replace("https://", ""):
-                details[section].append(link["href"].strip())
+        links = []
+        for html in await fetch_pages(client, url) or []:
+            links.extend(extract_links(html))
+        # Neighbouring pages can overlap, keep the first occurrence only
+        details[section] = list(dict.fromkeys(links))
     return details
 
 
-def scrape_poems_list(poets_file, poems_list_file):
+async def scrape_poems_list(poets_file, poems_list_file):
     with open(poets_file) as f:
         poets = json.load(f)
 
     poems_list = {}
-    for poet in tqdm(poets):
-        details = get_links(poet["href"])
-        poems_list[poet["href"]] = details
+    async with RekhtaClient() as client:
+        for poet in tqdm(poets):
+            details = await get_links(client, poet["href"])
+            poems_list[poet["href"]] = details
 
     with open(poems_list_file, "w") as f:
         json.dump(poems_list, f, ensure_ascii=False, indent=2)
 
 
+async def main():
+    async with report_metrics("poems_list"):
+        await scrape_poems_list(IN_FILE, OUT_FILE)
+
+
 if __name__ == "__main__":
-    scrape_poems_list(IN_FILE, OUT_FILE)
+    asyncio.run(main())
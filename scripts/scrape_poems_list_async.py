@@ -1,69 +1,86 @@
 import os
 import asyncio
-import aiohttp
-import aiofiles
-from bs4 import BeautifulSoup
+import argparse
 from tqdm import tqdm
 import json
+from rekhta import PageCache, ParsePool, RekhtaClient, fetch_pages, report_metrics
+from rekhta.journal import RecordWriter, compact_records, load_done_keys
 
 IN_FILE = "data/rekhta_all_poets_list.json"
 OUT_FILE = "data/rekhta_all_poets_poems_list.json"
+JOURNAL_FILE = "data/rekhta_all_poets_poems_list.journal.jsonl"
 BATCH_SIZE = 150
+PARSE_WORKERS = os.cpu_count()
 
 links_sections = ["ghazals", "nazms"]
 
 
-async def get_links(session, poet_url, dump_file, dump):
+async def get_links(client, parser, poet_url, writer):
     details = {"ghazals": [], "nazms": []}
 
     for section in links_sections:
         url = f"{poet_url}/{section}"
-        async with session.get(url) as response:
-            text = await response.text()
-            soup = BeautifulSoup(text, "html.parser")
-
-            content_section = soup.find(
-                "div",
-                {
-                    "class": "contentListBody contentLoadMoreSection rt_miriyaatSec rt_manageColumn"
-                },
-            )
-            links = content_section.find_all("a") if content_section is not None else []
-
-            for link in links:
-                if link.get("href") and "//" not in link["href"].replace(
-                    "https://", ""
-                ):
-                    details[section].append(link["href"].strip())
-    dump[poet_url] = details
-    with open(dump_file, "w") as f:
-        json.dump(dump, f, ensure_ascii=False, indent=2)
+        pages = await fetch_pages(client, url, parser=parser)
+        if pages is None:
+            # Not journaled, so the poet is listed again on the next run
+            # instead of being recorded as having no poems
+            print(f"Could not list {url}, will retry on the next run")
+            return None
+        page_links = await asyncio.gather(
+            *[parser.extract("links", html) for html in pages]
+        )
+        links = [link for links in page_links for link in links]
+        # Neighbouring pages can overlap, keep the first occurrence only
+        details[section] = list(dict.fromkeys(links))
+    writer.write({"poet": poet_url, "details": details})
     return details
 
 
-async def process_batch(batch, session, dump_file, dump):
+async def process_batch(batch, client, parser, writer):
     tasks = [
-        asyncio.create_task(get_links(session, poet["href"], dump_file, dump))
+        asyncio.create_task(get_links(client, parser, poet["href"], writer))
         for poet in batch
     ]
     await asyncio.gather(*tasks)
 
 
-async def scrape_poems_list(poets_file, dump_file):
+async def scrape_poems_list(poets_file, dump_file, journal_file, relist=False):
     with open(poets_file) as f:
         poets = json.load(f)
 
-    if os.path.exists(dump_file):
-        with open(dump_file) as f:
-            dump = json.load(f)
-    else:
-        dump = {}
+    # Poets already listed in the dump or the journal are skipped, unless
+    # every list is wanted afresh (e.g. before refresh.py)
+    cache = PageCache.from_env()
+    if not relist:
+        done = load_done_keys(dump_file, journal_file)
+        poets = [poet for poet in poets if poet["href"] not in done]
+    elif cache is not None and cache.mode == "use":
+        # Cached lists would hide new poems from refresh.py; revalidate them
+        cache = PageCache(cache.cache_dir, "revalidate")
 
-    async with aiohttp.ClientSession() as session:
-        for i in tqdm(range(0, len(poets), BATCH_SIZE), desc="Processing batches"):
-            batch = poets[i : i + BATCH_SIZE]
-            await process_batch(batch, session, dump_file, dump)
+    try:
+        with RecordWriter(journal_file) as writer:
+            with ParsePool(PARSE_WORKERS) as parser:
+                async with RekhtaClient(cache=cache) as client:
+                    for i in tqdm(
+                        range(0, len(poets), BATCH_SIZE), desc="Processing batches"
+                    ):
+                        batch = poets[i : i + BATCH_SIZE]
+                        await process_batch(batch, client, parser, writer)
+    finally:
+        compact_records(dump_file, journal_file, value="details")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Scrape every poet's poem lists")
+    parser.add_argument(
+        "--all", action="store_true", help="re-list poets that are already listed"
+    )
+    args = parser.parse_args()
+
+    async with report_metrics("poems_list"):
+        await scrape_poems_list(IN_FILE, OUT_FILE, JOURNAL_FILE, relist=args.all)
 
 
 if __name__ == "__main__":
-    asyncio.run(scrape_poems_list(IN_FILE, OUT_FILE))
+    asyncio.run(main())
@@ -1,102 +1,70 @@
-import os
-import requests
-from bs4 import BeautifulSoup
+import asyncio
 from tqdm import tqdm
 import json
+from rekhta import (
+    LANGS,
+    RekhtaClient,
+    extract_shers,
+    fetch_pages,
+    plan_fetches,
+    report_metrics,
+)
+from rekhta.alignment import flag_mismatch, zip_shers
+from rekhta.journal import RecordWriter, compact_records, load_done_keys
 
 IN_FILE = "data/rekhta_all_poets_list.json"
 OUT_FILE = "data/rekhta_all_poets_shers.json"
+JOURNAL_FILE = "data/rekhta_all_poets_shers.journal.jsonl"
+MISMATCH_FILE = "data/rekhta_all_poets_shers.mismatches.jsonl"
 
 
-def scrape_lines(poem_div):
-    lines = []
-    sections = poem_div.find_all("div", class_="w")
-    for section in sections:
-        poem_lines = section.find_all("p")
-        for poem_line in poem_lines:
-            lines.append(poem_line.text)
-        lines.append("")
-    poem = "\n".join(lines)
-    poem = poem.strip().strip("\n")
-    return poem
-
-
-def get_shers(poet_url, lang="hi", romanized=False):
+async def get_shers(client, poet_url, lang="hi", variants=None):
+    variants = variants or [lang]
     section = "couplets"
     url = f"{poet_url}/{section}"
-    response = requests.get(url, params={"lang": lang})
-    soup = BeautifulSoup(response.text, "html.parser")
-
-    shers = []
-
-    main_shers_section = soup.find(
-        "div", {"class": "sherContainer contentLoadMoreSection nwPoetSher fixed_Quote"}
-    )
-    if main_shers_section is None:
-        return []
-    for sher_section in main_shers_section.find_all("div", class_="sherSection"):
-        if lang != "en":
-            poem_divs = sher_section.find("div", {"class": "pMC", "data-roman": "on"})
-            if poem_divs is None:
-                poem_divs = sher_section.find(
-                    "div", {"class": "pMC", "data-roman": "off"}
-                )
-        else:
-            if romanized:
-                poem_divs = sher_section.find(
-                    "div", {"class": "pMC", "data-roman": "on"}
-                )
-            else:
-                poem_divs = sher_section.find(
-                    "div", {"class": "pMC", "data-roman": "off"}
-                )
-        for div in poem_divs.find_all("div", {"class": "t"}):
-            div.decompose()
-        sher = scrape_lines(poem_divs)
-        shers.append(sher)
+    shers = {variant: [] for variant in variants}
+    for html in await fetch_pages(client, url, params={"lang": lang}) or []:
+        extracted = extract_shers(html, variants)
+        for variant in variants:
+            shers[variant].extend(extracted[variant])
     return shers
 
 
-def scrape_shers(poets_list_file, shers_dump_file):
+async def scrape_shers(
+    poets_list_file, shers_dump_file, journal_file, mismatch_file=MISMATCH_FILE
+):
     with open(poets_list_file) as f:
         poets = json.load(f)
 
-    if os.path.exists(shers_dump_file):
-        with open(shers_dump_file) as f:
-            sher_dump = json.load(f)
-    else:
-        sher_dump = {}
+    done = load_done_keys(shers_dump_file, journal_file)
+
+    try:
+        with RecordWriter(journal_file) as writer:
+            async with RekhtaClient() as client:
+                for poet in tqdm(poets):
+                    if poet["href"] in done:
+                        continue
+                    poet_shers = {}
+                    for page_lang, variants in tqdm(plan_fetches(LANGS).items()):
+                        shers = await get_shers(
+                            client, poet["href"], lang=page_lang, variants=variants
+                        )
+                        poet_shers.update(shers)
 
-    for poet in tqdm(poets):
-        if poet["href"] in sher_dump:
-            continue
-        poet_shers = {}
-        for lang in tqdm(["en-rm", "en", "hi", "ur"]):
-            romanized = "rm" in lang
-            shers = get_shers(poet["href"], lang=lang, romanized=romanized)
-            poet_shers[lang] = shers
+                    # Uneven counts are padded with None and recorded, not fatal
+                    poet_data, counts = zip_shers(poet_shers)
+                    if counts is not None:
+                        flag_mismatch(mismatch_file, poet["href"], counts)
 
-        assert (
-            len(poet_shers["en"])
-            == len(poet_shers["en-rm"])
-            == len(poet_shers["hi"])
-            == len(poet_shers["ur"])
-        )
+                    writer.write({"poet": poet["href"], "shers": poet_data})
+    finally:
+        compact_records(shers_dump_file, journal_file)
 
-        sher_dump[poet["href"]] = []
-        for i in range(len(poet_shers["en"])):
-            sher_dump[poet["href"]].append(
-                {
-                    "hi": poet_shers["hi"][i],
-                    "en": poet_shers["en"][i],
-                    "en-rm": poet_shers["en-rm"][i],
-                    "ur": poet_shers["ur"][i],
-                }
-            )
 
-        with open(shers_dump_file, "w") as f:
-            json.dump(sher_dump, f, ensure_ascii=False, indent=2)
+async def main():
+    async with report_metrics("shers"):
+        await scrape_shers(IN_FILE, OUT_FILE, JOURNAL_FILE)
 
 
 if __name__ == "__main__":
-    scrape_shers(IN_FILE, OUT_FILE)
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+import os
+import json
+import time
+import argparse
+from rekhta.corpus import CORPUS_FORMS, DUMP_FILES, load_dump
+from rekhta.search import (
+    index_dump,
+    open_index,
+    record_source,
+    search,
+    source_unchanged,
+)
+
+# Full-text search over the scraped shers, ghazals and nazms.
+#   python scripts/search.py index          # (re)index the dumps that changed
+#   python scripts/search.py query "chaar din" --lang en-rm
+# Queries are folded the same way as the index, so diacritics, nukta and
+# Arabic/Urdu letter variants do not have to match exactly.
+
+INDEX_FILE = "data/rekhta_search.sqlite"
+
+
+def build_index(index_file, dump_files, force=False):
+    conn = open_index(index_file)
+    for form, dump_file in dump_files.items():
+        if not os.path.exists(dump_file):
+            print(f"Skipping {form}, {dump_file} does not exist")
+            continue
+        if not force and source_unchanged(conn, dump_file, form):
+            print(f"{form}: {dump_file} unchanged since last run")
+            continue
+
+        start = time.perf_counter()
+        added, updated, removed = index_dump(conn, form, load_dump(dump_file))
+        record_source(conn, dump_file, form)
+        print(
+            f"{form}: {added} added, {updated} updated, {removed} removed "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+    conn.close()
+
+
+def run_query(index_file, query, lang, form, poet, limit, as_json):
+    conn = open_index(index_file)
+    start = time.perf_counter()
+    results = search(conn, query, lang=lang, form=form, poet=poet, limit=limit)
+    elapsed = time.perf_counter() - start
+    conn.close()
+
+    if as_json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    for result in results:
+        print(f"{result['poet']}  {result['form']}  {result['lang']}")
+        if result["url"]:
+            print(f"{result['url']}  (sher {result['sher'] + 1})")
+        print(result["text"])
+        print()
+    print(f"{len(results)} result(s) in {elapsed * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search over the corpus")
+    parser.add_argument("--index", default=INDEX_FILE)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = commands.add_parser("index", help="index new or changed dumps")
+    index_parser.add_argument("--forms", nargs="+", default=list(CORPUS_FORMS))
+    index_parser.add_argument(
+        "--force", action="store_true", help="re-check dumps even if unchanged"
+    )
+
+    query_parser = commands.add_parser("query", help="search the index")
+    query_parser.add_argument("query")
+    query_parser.add_argument("--lang")
+    query_parser.add_argument("--form", choices=CORPUS_FORMS)
+    query_parser.add_argument("--poet")
+    query_parser.add_argument("--limit", type=int, default=20)
+    query_parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "index":
+        dump_files = {form: DUMP_FILES[form] for form in args.forms}
+        build_index(args.index, dump_files, force=args.force)
+    else:
+        run_query(
+            args.index,
+            args.query,
+            args.lang,
+            args.form,
+            args.poet,
+            args.limit,
+            args.json,
+        )
+
+
+if __name__ == "__main__":
+    main()